@@ -0,0 +1,107 @@
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Query profiler.
+#
+# Counts the SQL statements of every request and the time spent running
+# them, reported in a Server-Timing header. Statements are grouped by
+# fingerprint, their text without literals and parameters: a fingerprint
+# repeated PROFILER_N_PLUS_ONE times is logged as a likely N+1 pattern.
+# Requests running more than their query budget, PROFILER_QUERY_BUDGET or
+# the one of query_budget, are logged too, and fail when TESTING.
+# Queries of streamed responses run after the headers are sent and are not
+# counted.
+#----------------------------------------------------------------------------#
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PARAMETERS = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACES = re.compile(r'\s+')
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def fingerprint(statement):
+    '''
+    `statement` without its literals and parameters, and with its lists of
+    any length, as in IN (...), written the same.
+    '''
+    statement = PARAMETERS.sub('?', LITERALS.sub('?', statement))
+    return SPACES.sub(' ', LISTS.sub('(...)', statement)).strip()
+
+class QueryProfile(object):
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, times):
+        return [(statement, count) for statement, count in self.fingerprints.most_common() if count >= times]
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_profile' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if starts and has_request_context() and 'query_profile' in g:
+        g.query_profile.record(statement, time.perf_counter() - starts.pop())
+
+def query_budget(max_queries):
+    '''
+    Most queries the decorated view may run, instead of PROFILER_QUERY_BUDGET.
+    '''
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+class QueryProfiler(object):
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_ENABLED', True)
+        app.config.setdefault('PROFILER_N_PLUS_ONE', 5)
+        app.config.setdefault('PROFILER_QUERY_BUDGET', None)
+        if app.config['PROFILER_ENABLED']:
+            app.before_request(self.start)
+            app.after_request(self.finish)
+
+    def start(self):
+        g.query_profile = QueryProfile()
+
+    def finish(self, response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+        response.headers.add('Server-Timing', 'db;dur=%.1f;desc="%d queries"' % (1000 * profile.duration, profile.count))
+
+        config = current_app.config
+        for statement, count in profile.repeated(config['PROFILER_N_PLUS_ONE']):
+            current_app.logger.warning('N+1 queries in %s: %d x %s', request.endpoint, count, statement)
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', config['PROFILER_QUERY_BUDGET'])
+        if budget is not None and profile.count > budget:
+            message = '%s ran %d queries, over its budget of %d' % (request.endpoint, profile.count, budget)
+            if current_app.testing:
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+        return response
+
+profiler = QueryProfiler()
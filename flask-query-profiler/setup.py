@@ -0,0 +1,9 @@
+from setuptools import setup
+
+setup(
+    name='flask-query-profiler',
+    version='0.1.0',
+    description='Per-request SQL query counts, Server-Timing headers, N+1 warnings and query budgets for Flask apps.',
+    packages=['flask_query_profiler'],
+    install_requires=['Flask', 'SQLAlchemy']
+)
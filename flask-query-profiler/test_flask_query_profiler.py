@@ -0,0 +1,50 @@
+import unittest
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from flask_query_profiler import QueryProfiler, QueryBudgetExceeded, fingerprint, query_budget
+
+
+class QueryProfilerTestCase(unittest.TestCase):
+    def profiled_app(self):
+        """A Flask app with the query profiler and routes running one query per item."""
+        profiled = Flask(__name__)
+        profiled.testing = True
+        QueryProfiler(profiled)
+        engine = create_engine('sqlite://')
+        self.addCleanup(engine.dispose)
+
+        @profiled.route('/items/<int:count>')
+        def items(count):
+            with engine.connect() as connection:
+                for id in range(count):
+                    connection.execute(text('SELECT %d' % id)).scalar()
+            return 'ok'
+
+        @profiled.route('/budget/<int:count>')
+        @query_budget(2)
+        def budget(count):
+            return items(count)
+        return profiled
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint("SELECT * FROM venues WHERE id = 12 AND name = 'It''s'"), 'SELECT * FROM venues WHERE id = ? AND name = ?')
+        self.assertEqual(fingerprint('SELECT * FROM shows\n WHERE venue_id IN (%(id_1)s, %(id_2)s)'), fingerprint('SELECT * FROM shows WHERE venue_id IN (?)'))
+
+    def test_query_profiler(self):
+        client = self.profiled_app().test_client()
+        response = client.get('/items/3')
+        self.assertRegex(response.headers['Server-Timing'], r'^db;dur=[0-9.]+;desc="3 queries"$')
+
+        with self.assertLogs(level='WARNING') as logs:
+            client.get('/items/6')
+        self.assertIn('N+1 queries in items: 6 x SELECT ?', logs.output[0])
+
+        self.assertEqual(client.get('/budget/2').status_code, 200)
+        with self.assertRaises(QueryBudgetExceeded):
+            client.get('/budget/3')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+from datetime import date, datetime
+
+from flask import Blueprint, Response, abort, jsonify, request, stream_with_context
+
+from replica import use_replica
+import queries
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#
+# Lists are streamed: the response is written while the rows are read, in
+# chunks of about CHUNK_SIZE bytes, so neither the app nor the database
+# driver hold a whole table in memory. ?fields=id,name selects the fields.
+#----------------------------------------------------------------------------#
+
+CHUNK_SIZE = 16 * 1024
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+# Every endpoint only reads
+api.before_request(use_replica)
+
+def to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % value)
+
+def encode(value):
+    return json.dumps(value, default=to_json, separators=(',', ':'))
+
+def stream_list(items):
+    '''
+    Chunks of the JSON document {"data": [...]} listing `items`.
+    '''
+    chunk = ['{"data":[']
+    size = 0
+    separator = ''
+    for item in items:
+        text = separator + encode(item)
+        chunk.append(text)
+        size += len(text)
+        separator = ','
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    chunk.append(']}')
+    yield ''.join(chunk)
+
+def selected_fields(available):
+    '''
+    Fields of ?fields= among `available`, every field by default. Aborts on
+    unknown fields.
+    '''
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    if not fields:
+        return list(available)
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        abort(400, 'Unknown fields: %s' % ', '.join(unknown))
+    return fields
+
+def streamed(kind):
+    items = queries.stream(kind, selected_fields(queries.STREAM_COLUMNS[kind]))
+    return Response(stream_with_context(stream_list(items)), mimetype='application/json')
+
+@api.route('/venues')
+def venues():
+    return streamed('venues')
+
+@api.route('/artists')
+def artists():
+    return streamed('artists')
+
+@api.route('/shows')
+def shows():
+    return streamed('shows')
+
+def detail(data):
+    if data is None:
+        abort(404)
+    data = dict((field, data[field]) for field in selected_fields(data))
+    return Response(encode({'data': data}), mimetype='application/json')
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return detail(queries.venue_detail(venue_id))
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return detail(queries.artist_detail(artist_id))
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def error(e):
+    return jsonify(error=e.code, message=e.description), e.code
@@ -4,46 +4,98 @@
 
 import sys
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, abort
 from sqlalchemy import text, func
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
 from models import *
+from cache import cache
+from importer import fyyur_cli
+from writes import write_behind
+from api import api
+from feeds import feeds
+from pool import pool_status
+from replica import read_only, reading_own_writes
+from flask_query_profiler import profiler, query_budget
+import seed
+import dates
+import queries
+import schedule
+import counters  # registers the show counter updates
+
+cache.init_app(app)
+write_behind.init_app(app)
+profiler.init_app(app)
+app.cli.add_command(fyyur_cli)
+app.register_blueprint(api)
+app.register_blueprint(feeds)
+
+# Cached routes whose data changes with each kind of write
+VENUE_ROUTES = ('index', 'venues', 'shows', 'venue_choices')
+ARTIST_ROUTES = ('index', 'artists', 'shows', 'artist_choices')
+SHOW_ROUTES = ('venues', 'shows')
+
+write_behind.register('venue', Venue, VENUE_ROUTES)
+write_behind.register('artist', Artist, ARTIST_ROUTES)
+write_behind.register('show', Show, SHOW_ROUTES)
+
+def cached(route, builder, *args):
+  # Clients reading their own writes skip the cache, whose entries may have
+  # been built from a replica that doesn't have these writes yet
+  if reading_own_writes():
+    return builder(*args)
+  return cache.get_or_set(route, builder, *args)
 
-class Show(db.Model):
-    __tablename__ = 'Show'
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
 
-    id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-    start_time = db.Column('start_time', db.DateTime)
+app.jinja_env.filters['datetime'] = dates.format_datetime
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Form data.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+def venue_data(form):
+  return {
+    'name': form['name'],
+    'city': form['city'],
+    'state': form['state'],
+    'address': form['address'],
+    'phone': form['phone'],
+    'genres': form.getlist('genres'),
+    'image_link': form['image_link'],
+    'facebook_link': form['facebook_link'],
+    'website': form['website'],
+    'seeking_talent': 'seeking_talent' in form,
+    'seeking_description': form['seeking_description']
+  }
 
-app.jinja_env.filters['datetime'] = format_datetime
+def artist_data(form):
+  return {
+    'name': form['name'],
+    'city': form['city'],
+    'state': form['state'],
+    'phone': form['phone'],
+    'genres': form.getlist('genres'),
+    'image_link': form['image_link'],
+    'facebook_link': form['facebook_link'],
+    'website': form['website'],
+    'seeking_venue': 'seeking_venue' in form,
+    'seeking_description': form['seeking_description']
+  }
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
 @app.route('/')
+@read_only
+@query_budget(2)
 def index():
-  venues = Venue.query.order_by(Venue.create_time.desc()).limit(10).all()
-  artists = Artist.query.order_by(Artist.create_time.desc()).limit(10).all()
+  venues, artists = cached('index', lambda: (queries.latest(Venue), queries.latest(Artist)))
   return render_template('pages/home.html', venues=venues, artists=artists)
 
 
@@ -51,102 +103,56 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@read_only
+@query_budget(1)
 def venues():
-  # Query the venues grouped by location City/State
-  locations_query = Venue.query.with_entities(func.count(Venue.id), Venue.city, Venue.state).group_by(Venue.city, Venue.state).all()
-
-  if locations_query == None:
-    return not_found_error('No venues found')
-
-  today = datetime.now()
-  data = []
-
-  for location in locations_query:
-    # Query all the venues from each location
-    venues_location = Venue.query.filter_by(state=location.state).filter_by(city=location.city).all()
-    venues_data = []
-    for venue in venues_location:
-      venues_data.append({
-        'id': venue.id,
-        'name': venue.name,
-        'num_upcoming_shows': len(Show.query.join(Venue).filter(Show.venue_id == venue.id).filter(Show.start_time >= today).all())
-      })
-    data.append({
-      'city': location.city,
-      'state': location.state,
-      'venues': venues_data
-    })
+  # Venues grouped by location City/State with their upcoming shows count
+  data = cached('venues', queries.venue_areas)
 
   return render_template('pages/venues.html', areas=data)
 
 @app.route('/venues/search', methods=['POST'])
+@read_only
+@query_budget(1)
 def search_venues():
   # Implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-  venues_query = Venue.query.filter(Venue.name.ilike('%' + request.form.get('search_term') + '%'))
-  data = []
-  today = datetime.now()
-  for venue in venues_query:
-    data.append({
-      'id': venue.id,
-      'name': venue.name,
-      'num_upcoming_shows': Show.query.join(Artist).filter(Show.venue_id == venue.id).filter(Show.start_time >= today).count()
-    })
-  response = {
-    'count': venues_query.count(),
-    'data': data
-  }
+  response = queries.search_venues(request.form.get('search_term', ''))
 
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
+@app.route('/venues/genres/<genre>')
+@read_only
+@query_budget(1)
+def venues_by_genre(genre):
+  # Venues playing a genre, looked up by name or slug, e.g. /venues/genres/rock-n-roll
+  genre_name = lookup_genre(genre)
+  if genre_name == None:
+    return not_found_error('Genre %s not found' % genre)
+
+  response = queries.venues_by_genre(genre_name)
+
+  return render_template('pages/search_venues.html', results=response, search_term=genre_name)
+
+@app.route('/venues/autocomplete')
+@read_only
+@query_budget(1)
+def autocomplete_venues():
+  # Best venue name matches of ?q=, for the show form of large catalogues
+  term = request.args.get('q', '')
+  return jsonify(data=cached('venue_choices', queries.autocomplete, Venue, term))
+
 @app.route('/venues/<int:venue_id>')
+@read_only
+@query_budget(1)
 def show_venue(venue_id):
-  # Get the venue by its id
-  venue_query = Venue.query.get(venue_id)
+  # Get the venue by its id together with its shows
+  data = queries.venue_detail(venue_id, datetime.now())
 
-  if venue_query == None:
+  if data == None:
     return not_found_error('Venue %d not found' % venue_id)
 
-  today = datetime.now()
-  past_shows_query = Show.query.join(Artist).filter(Show.venue_id == venue_id).filter(Show.start_time < today).all()
-  past_shows = []
-  for el in past_shows_query:
-    past_shows.append({
-      'artist_id' : el.artist_id,
-      'artist_name' : el.artist.name,
-      'artist_image_link': el.artist.image_link,
-      'start_time': el.start_time.strftime('%Y-%m-%d %H:%M:%S')
-    })
-  upcoming_shows_query = Show.query.join(Artist).filter(Show.venue_id == venue_id).filter(Show.start_time >= today).all()
-  upcoming_shows = []
-  for el in upcoming_shows_query:
-    upcoming_shows.append({
-      'artist_id' : el.artist_id,
-      'artist_name' : el.artist.name,
-      'artist_image_link': el.artist.image_link,
-      'start_time': el.start_time.strftime('%Y-%m-%d %H:%M:%S')
-    })
-
-  data = {
-    'id': venue_query.id,
-    'name': venue_query.name,
-    'city': venue_query.city,
-    'state': venue_query.state,
-    'address': venue_query.address,
-    'phone': venue_query.phone,
-    'genres': venue_query.genres[1:-1].replace('"', '').split(','),
-    'image_link': venue_query.image_link,
-    'facebook_link' : venue_query.facebook_link,
-    'website': venue_query.website,
-    'seeking_talent': venue_query.seeking_talent,
-    'seeking_description': venue_query.seeking_description,
-    'past_shows': past_shows,
-    'upcoming_shows': upcoming_shows,
-    'past_shows_count': len(past_shows),
-    'upcoming_shows_count': len(upcoming_shows)
-  }
-
   return render_template('pages/show_venue.html', venue=data)
 
 #  Create Venue
@@ -171,22 +177,16 @@ def create_venue_submission():
       flash('Error! Venue ' + request.form['name'] + ' could not be created!' + errors)
       return render_template('forms/new_venue.html', form=form)
   else:
+    data = venue_data(request.form)
+    if write_behind.enabled:
+      write_id = write_behind.enqueue('venue', data)
+      flash('Venue ' + request.form['name'] + ' was submitted, see /writes/%d for its status.' % write_id)
+      return render_template('pages/home.html')
     try:
-      venue = Venue(
-        name = request.form['name'],
-        city = request.form['city'],
-        state = request.form['state'],
-        address = request.form['address'],
-        phone = request.form['phone'],
-        genres = request.form.getlist('genres'),
-        image_link = request.form['image_link'],
-        facebook_link = request.form['facebook_link'],
-        website = request.form['website'],
-        seeking_talent = 'seeking_talent' in request.form,
-        seeking_description = request.form['seeking_description']
-      )
+      venue = Venue(**data)
       db.session.add(venue)
       db.session.commit()
+      cache.invalidate(*VENUE_ROUTES)
       flash('Venue ' + request.form['name'] + ' was successfully created!')
     except:
       db.session.rollback()
@@ -209,6 +209,7 @@ def delete_venue(venue_id):
   try:
     Venue.query.filter_by(id=venue_id).delete()
     db.session.commit()
+    cache.invalidate(*VENUE_ROUTES)
     flash('Venue "' + name + '" was successfully deleted!')
   except:
     db.session.rollback()
@@ -226,89 +227,56 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@read_only
+@query_budget(1)
 def artists():
   # Query all the artists ordered by id
-  artists_query = Artist.query.with_entities(Artist.id, Artist.name).order_by(Artist.id.asc()).all()
-
-  if artists_query == None:
-    return not_found_error('No artists found')
-
-  data = []
-  for artist in artists_query:
-    data.append({
-      'id': artist.id,
-      'name': artist.name
-    })
+  data = cached('artists', queries.artist_list)
 
   return render_template('pages/artists.html', artists=data)
 
 @app.route('/artists/search', methods=['POST'])
+@read_only
+@query_budget(1)
 def search_artists():
   # Implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
-  artists_query = Artist.query.filter(Artist.name.ilike('%' + request.form.get('search_term') + '%'))
-  data = []
-  today = datetime.now()
-  for artist in artists_query:
-    data.append({
-      'id': artist.id,
-      'name': artist.name,
-      'num_upcoming_shows': Show.query.join(Venue).filter(Show.artist_id == artist.id).filter(Show.start_time >= today).count()
-    })
-  response = {
-    'count': artists_query.count(),
-    'data': data
-  }
+  response = queries.search_artists(request.form.get('search_term', ''))
 
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
+@app.route('/artists/genres/<genre>')
+@read_only
+@query_budget(1)
+def artists_by_genre(genre):
+  # Artists playing a genre, looked up by name or slug, e.g. /artists/genres/rock-n-roll
+  genre_name = lookup_genre(genre)
+  if genre_name == None:
+    return not_found_error('Genre %s not found' % genre)
+
+  response = queries.artists_by_genre(genre_name)
+
+  return render_template('pages/search_artists.html', results=response, search_term=genre_name)
+
+@app.route('/artists/autocomplete')
+@read_only
+@query_budget(1)
+def autocomplete_artists():
+  # Best artist name matches of ?q=, for the show form of large catalogues
+  term = request.args.get('q', '')
+  return jsonify(data=cached('artist_choices', queries.autocomplete, Artist, term))
+
 @app.route('/artists/<int:artist_id>')
+@read_only
+@query_budget(1)
 def show_artist(artist_id):
-  # Get the artist by its id
-  artist_query = Artist.query.get(artist_id)
+  # Get the artist by its id together with its shows
+  data = queries.artist_detail(artist_id, datetime.now())
 
-  if artist_query == None:
+  if data == None:
     return not_found_error('Artist %d not found' % artist_id)
 
-  today = datetime.now()
-  past_shows_query = Show.query.join(Venue).filter(Show.artist_id == artist_id).filter(Show.start_time < today).all()
-  past_shows = []
-  for el in past_shows_query:
-    past_shows.append({
-      'venue_id' : el.venue_id,
-      'venue_name' : el.venue.name,
-      'venue_image_link': el.venue.image_link,
-      'start_time': el.start_time.strftime('%Y-%m-%d %H:%M:%S')
-    })
-  upcoming_shows_query = Show.query.join(Venue).filter(Show.artist_id == artist_id).filter(Show.start_time >= today).all()
-  upcoming_shows = []
-  for el in upcoming_shows_query:
-    upcoming_shows.append({
-      'venue_id' : el.venue_id,
-      'venue_name' : el.venue.name,
-      'venue_image_link': el.venue.image_link,
-      'start_time': el.start_time.strftime('%Y-%m-%d %H:%M:%S')
-    })
-
-  data = {
-    'id': artist_query.id,
-    'name': artist_query.name,
-    'city': artist_query.city,
-    'state': artist_query.state,
-    'phone': artist_query.phone,
-    'genres': artist_query.genres[1:-1].replace('"', '').split(','),
-    'image_link': artist_query.image_link,
-    'facebook_link' : artist_query.facebook_link,
-    'website': artist_query.website,
-    'seeking_venue': artist_query.seeking_venue,
-    'seeking_description': artist_query.seeking_description,
-    'past_shows': past_shows,
-    'upcoming_shows': upcoming_shows,
-    'past_shows_count': len(past_shows),
-    'upcoming_shows_count': len(upcoming_shows)
-  }
-
   return render_template('pages/show_artist.html', artist=data)
 
 #  Update
@@ -325,7 +293,7 @@ def edit_artist(artist_id):
   form = ArtistForm()
   form.name.default = artist_query.name
   if artist_query.genres:
-    form.genres.default = artist_query.genres[1:-1].replace('"', '').split(',')
+    form.genres.default = artist_query.genres
   form.city.default = artist_query.city
   form.state.default = artist_query.state
   form.phone.default = artist_query.phone
@@ -345,7 +313,7 @@ def edit_artist(artist_id):
     'city': artist_query.city,
     'state': artist_query.state,
     'phone': artist_query.phone,
-    'genres': artist_query.genres[1:-1].replace('"', '').split(','),
+    'genres': artist_query.genres or [],
     'image_link': artist_query.image_link,
     'facebook_link' : artist_query.facebook_link,
     'website': artist_query.website,
@@ -359,24 +327,22 @@ def edit_artist(artist_id):
 def edit_artist_submission(artist_id):
   # TODO: take values from the form submitted, and update existing
   # artist record with ID <artist_id> using the new attributes
+  data = artist_data(request.form)
+  if write_behind.enabled:
+    write_id = write_behind.enqueue('artist', data, artist_id)
+    flash('Artist ' + request.form['name'] + ' update was submitted, see /writes/%d for its status.' % write_id)
+    return redirect(url_for('show_artist', artist_id=artist_id))
+
   artist_query = Artist.query.get(artist_id)
 
   if artist_query == None:
     return not_found_error('Artist %d not found' % artist_id)
 
   try:
-    artist_query.name = request.form['name']
-    artist_query.city = request.form['city']
-    artist_query.state = request.form['state']
-    artist_query.phone = request.form['phone']
-    artist_query.genres = request.form.getlist('genres')
-    artist_query.image_link = request.form['image_link']
-    artist_query.facebook_link = request.form['facebook_link']
-    artist_query.website = request.form['website']
-    artist_query.seeking_venue = 'seeking_venue' in request.form
-    artist_query.seeking_description = request.form['seeking_description']
-   
+    for key, value in data.items():
+      setattr(artist_query, key, value)
     db.session.commit()
+    cache.invalidate(*ARTIST_ROUTES)
     flash('Artist ' + request.form['name'] + ' was successfully updated!')
   except:
     db.session.rollback()
@@ -398,7 +364,7 @@ def edit_venue(venue_id):
   form = VenueForm()
   form.name.default = venue_query.name
   if venue_query.genres:
-    form.genres.default = venue_query.genres[1:-1].replace('"', '').split(',')
+    form.genres.default = venue_query.genres
   form.address.default = venue_query.address
   form.city.default = venue_query.city
   form.state.default = venue_query.state
@@ -420,7 +386,7 @@ def edit_venue(venue_id):
     'city': venue_query.city,
     'state': venue_query.state,
     'phone': venue_query.phone,
-    'genres': venue_query.genres[1:-1].replace('"', '').split(','),
+    'genres': venue_query.genres or [],
     'image_link': venue_query.image_link,
     'facebook_link' : venue_query.facebook_link,
     'website': venue_query.website,
@@ -433,25 +399,22 @@ def edit_venue(venue_id):
 def edit_venue_submission(venue_id):
   # TODO: take values from the form submitted, and update existing
   # venue record with ID <venue_id> using the new attributes
+  data = venue_data(request.form)
+  if write_behind.enabled:
+    write_id = write_behind.enqueue('venue', data, venue_id)
+    flash('Venue ' + request.form['name'] + ' update was submitted, see /writes/%d for its status.' % write_id)
+    return redirect(url_for('show_venue', venue_id=venue_id))
+
   venue_query = Venue.query.get(venue_id)
 
   if venue_query == None:
     return not_found_error('Venue %d not found' % venue_id)
 
   try:
-    venue_query.name = request.form['name']
-    venue_query.address = request.form['address']
-    venue_query.city = request.form['city']
-    venue_query.state = request.form['state']
-    venue_query.phone = request.form['phone']
-    venue_query.genres = request.form.getlist('genres')
-    venue_query.image_link = request.form['image_link']
-    venue_query.facebook_link = request.form['facebook_link']
-    venue_query.website = request.form['website']
-    venue_query.seeking_talent = 'seeking_talent' in request.form
-    venue_query.seeking_description = request.form['seeking_description']
-   
+    for key, value in data.items():
+      setattr(venue_query, key, value)
     db.session.commit()
+    cache.invalidate(*VENUE_ROUTES)
     flash('Venue ' + request.form['name'] + ' was successfully updated!')
   except:
     db.session.rollback()
@@ -484,21 +447,16 @@ def create_artist_submission():
       flash('Error! Artist ' + request.form['name'] + ' could not be created!' + errors)
       return render_template('forms/new_artist.html', form=form)
   else:
+    data = artist_data(request.form)
+    if write_behind.enabled:
+      write_id = write_behind.enqueue('artist', data)
+      flash('Artist ' + request.form['name'] + ' was submitted, see /writes/%d for its status.' % write_id)
+      return render_template('pages/home.html')
     try:
-      artist = Artist(
-        name = request.form['name'],
-        city = request.form['city'],
-        state = request.form['state'],
-        phone = request.form['phone'],
-        genres = request.form.getlist('genres'),
-        image_link = request.form['image_link'],
-        facebook_link = request.form['facebook_link'],
-        website = request.form['website'],
-        seeking_venue = 'seeking_venue' in request.form,
-        seeking_description = equest.form['seeking_description']
-      )
+      artist = Artist(**data)
       db.session.add(artist)
       db.session.commit()
+      cache.invalidate(*ARTIST_ROUTES)
       flash('Artist ' + request.form['name'] + ' was successfully created!')
     except:
       db.session.rollback()
@@ -518,6 +476,7 @@ def delete_artist(artist_id):
   try:
     Artist.query.filter_by(id=artist_id).delete()
     db.session.commit()
+    cache.invalidate(*ARTIST_ROUTES)
     flash('Artist "' + name + '" was successfully deleted!')
   except:
     db.session.rollback()
@@ -533,28 +492,20 @@ def delete_artist(artist_id):
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@read_only
+@query_budget(1)
 def shows():
-  # Get all the shows ordered by state_data
-  query = Show.query.join(Venue).filter(Show.venue_id == Venue.id).\
-    join(Artist).filter(Show.artist_id == Artist.id).\
-    with_entities(Venue.id, Venue.name, Artist.id, Artist.name, Artist.image_link, Show.start_time).\
-    order_by(Show.start_time.asc())
-
-  data = []
-  for el in query:
-    newshow = {
-      "venue_id": el[0],
-      "venue_name": el[1],
-      "artist_id": el[2],
-      "artist_name": el[3],
-      "artist_image_link": el[4],
-      "start_time": el[5].strftime('%Y-%m-%d %H:%M:%S')
-    }
-    data.append(newshow)
-
-  return render_template('pages/shows.html', shows=data)
+  # Get a page of shows ordered by start_time, starting after the ?after= cursor
+  try:
+    data, next_cursor = cached('shows', queries.shows_page, request.args.get('after'))
+  except ValueError:
+    abort(400)
+
+  start_times = dates.format_datetimes([show['start_time'] for show in data], 'full')
+  return render_template('pages/shows.html', shows=zip(data, start_times), next_cursor=next_cursor)
 
 @app.route('/shows/create')
+@query_budget(2)
 def create_shows():
   # renders form. do not touch.
   form = ShowForm()
@@ -564,14 +515,31 @@ def create_shows():
 def create_show_submission():
   # called to create new shows in the db, upon submitting new show listing form
   # TODO: insert form data as a new Show record in the db, instead
+  data = {
+    'artist_id': request.form['artist_id'],
+    'venue_id': request.form['venue_id'],
+    'start_time': request.form['start_time']
+  }
+  # Stored naive in UTC, as check_schedule and the importer compare them
+  start_time = data['start_time']
   try:
-    show = Show(
-      artist_id = request.form['artist_id'],
-      venue_id = request.form['venue_id'],
-      start_time = request.form['start_time']
-    )
+    start_time = dates.to_naive_utc(start_time)
+    conflict = schedule.find_conflict(int(data['venue_id']), int(data['artist_id']), start_time)
+  except (ValueError, OverflowError):
+    # Invalid values fail on insertion below
+    conflict = None
+  if conflict:
+    flash('Error! The venue or the artist already has a show at ' + dates.format_datetime(conflict['start_time'], 'full') + '.')
+    return render_template('forms/new_show.html', form=ShowForm(request.form))
+  if write_behind.enabled:
+    write_id = write_behind.enqueue('show', data)
+    flash('Show was submitted, see /writes/%d for its status.' % write_id)
+    return render_template('pages/home.html')
+  try:
+    show = Show(**dict(data, start_time=start_time))
     db.session.add(show)
     db.session.commit()
+    cache.invalidate(*SHOW_ROUTES)
     flash('Show was successfully listed!')
   except:
     db.session.rollback()
@@ -582,6 +550,36 @@ def create_show_submission():
 
   return render_template('pages/home.html')
 
+@app.route('/shows/check', methods=['POST'])
+@csrf.exempt
+def check_shows():
+  # Check a whole proposed schedule, {"shows": [{"venue_id", "artist_id", "start_time"}, ...]},
+  # against the existing shows and itself
+  body = request.get_json(silent=True)
+  if not isinstance(body, dict) or not isinstance(body.get('shows'), list):
+    abort(400)
+
+  conflicts = schedule.check_schedule(body['shows'])
+
+  return jsonify(checked=len(body['shows']), conflicts=conflicts)
+
+@app.route('/writes/<int:write_id>')
+def write_status(write_id):
+  # Status of a submission queued in write-behind mode: pending, running, done or failed
+  status = write_behind.status(write_id) if write_behind.enabled else None
+  if status == None:
+    abort(404)
+  return jsonify(status)
+
+@app.route('/cache/stats')
+def cache_stats():
+  return jsonify(cache.stats())
+
+@app.route('/pool/stats')
+def pool_stats():
+  # Connection pool occupancy and checkout wait times of this process
+  return jsonify(pool_status(db.engine))
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -601,329 +599,6 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
-def add_venues():
-  '''
-  Function for adding the mockup date to the Venue table
-  '''
-  data1={
-    #"id": 1,
-    "name": "The Musical Hop",
-    "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-    "address": "1015 Folsom Street",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "123-123-1234",
-    "website": "https://www.themusicalhop.com",
-    "facebook_link": "https://www.facebook.com/TheMusicalHop",
-    "seeking_talent": True,
-    "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-    "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-  }
-  data2={
-    #"id": 2,
-    "name": "The Dueling Pianos Bar",
-    "genres": ["Classical", "R&B", "Hip-Hop"],
-    "address": "335 Delancey Street",
-    "city": "New York",
-    "state": "NY",
-    "phone": "914-003-1132",
-    "website": "https://www.theduelingpianos.com",
-    "facebook_link": "https://www.facebook.com/theduelingpianos",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80",
-  }
-  data3={
-    #"id": 3,
-    "name": "Park Square Live Music & Coffee",
-    "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
-    "address": "34 Whiskey Moore Ave",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "415-000-1234",
-    "website": "https://www.parksquarelivemusicandcoffee.com",
-    "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-  }
-
-  try:
-    venues = [Venue(**data1), Venue(**data2), Venue(**data3)]
-    db.session.add_all(venues)
-    db.session.commit()
-  except:
-    db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
-
-def add_artist():
-  '''
-  Function for adding the mockup date to the Artist table
-  '''
-  dummy={
-    "name": "dummy",
-    "genres": ["Rock n Roll"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "000-000-0000",
-    "seeking_venue": False,
-  }
-  data1={
-    #"id": 4,
-    "name": "Guns N Petals",
-    "genres": ["Rock n Roll"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "326-123-5000",
-    "website": "https://www.gunsnpetalsband.com",
-    "facebook_link": "https://www.facebook.com/GunsNPetals",
-    "seeking_venue": True,
-    "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
-    "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-  }
-  data2={
-    #"id": 5,
-    "name": "Matt Quevedo",
-    "genres": ["Jazz"],
-    "city": "New York",
-    "state": "NY",
-    "phone": "300-400-5000",
-    "facebook_link": "https://www.facebook.com/mattquevedo923251523",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-  }
-  data3={
-    #"id": 6,
-    "name": "The Wild Sax Band",
-    "genres": ["Jazz", "Classical"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "432-325-5432",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-  }
-
-  try:
-    artists = [Artist(**dummy), Artist(**dummy), Artist(**dummy), Artist(**data1), Artist(**data2), Artist(**data3)]
-    db.session.add_all(artists)
-    db.session.commit()
-    Artist.query.filter_by(name='dummy').delete()
-    db.session.commit()
-  except:
-    db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
-
-def add_shows():
-  data=[{
-    "venue_id": 1,
-    "venue_name": "The Musical Hop",
-    "artist_id": 4,
-    "artist_name": "Guns N Petals",
-    "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-    "start_time": "2019-05-21T21:30:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 5,
-    "artist_name": "Matt Quevedo",
-    "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-    "start_time": "2019-06-15T23:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-01T20:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-08T20:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-15T20:00:00.000Z"
-  }]
-
-  try:
-    shows = []
-    for el in data:
-      del el['venue_name']
-      del el['artist_name']
-      del el['artist_image_link']
-      shows.append(Show(**el))
-    db.session.add_all(shows)
-    db.session.commit()
-  except:
-    db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
-
-POPULATE = False
-if POPULATE == True:
-  db.drop_all(app=app)
-  db.create_all(app=app)
-  add_venues()
-  add_artist()
-  add_shows()
-
-
-def add_venues():
-  data1={
-    "id": 1,
-    "name": "The Musical Hop",
-    "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-    "address": "1015 Folsom Street",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "123-123-1234",
-    "website": "https://www.themusicalhop.com",
-    "facebook_link": "https://www.facebook.com/TheMusicalHop",
-    "seeking_talent": True,
-    "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-    "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-  }
-  data2={
-    "id": 2,
-    "name": "The Dueling Pianos Bar",
-    "genres": ["Classical", "R&B", "Hip-Hop"],
-    "address": "335 Delancey Street",
-    "city": "New York",
-    "state": "NY",
-    "phone": "914-003-1132",
-    "website": "https://www.theduelingpianos.com",
-    "facebook_link": "https://www.facebook.com/theduelingpianos",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80",
-  }
-  data3={
-    "id": 3,
-    "name": "Park Square Live Music & Coffee",
-    "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
-    "address": "34 Whiskey Moore Ave",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "415-000-1234",
-    "website": "https://www.parksquarelivemusicandcoffee.com",
-    "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-  }
-
-  #Venue.__table__.drop(db, checkfirst=True)
-  #Venue.__table__.create(db)
-
-  db.session.query(Venue).delete()
-  venues = [Venue(**data1), Venue(**data2), Venue(**data3)]
-  db.session.add_all(venues)
-  db.session.commit()
-
-def add_artist():
-  data1={
-    "id": 4,
-    "name": "Guns N Petals",
-    "genres": ["Rock n Roll"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "326-123-5000",
-    "website": "https://www.gunsnpetalsband.com",
-    "facebook_link": "https://www.facebook.com/GunsNPetals",
-    "seeking_venue": True,
-    "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
-    "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-  }
-  data2={
-    "id": 5,
-    "name": "Matt Quevedo",
-    "genres": ["Jazz"],
-    "city": "New York",
-    "state": "NY",
-    "phone": "300-400-5000",
-    "facebook_link": "https://www.facebook.com/mattquevedo923251523",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-    }
-  data3={
-    "id": 6,
-    "name": "The Wild Sax Band",
-    "genres": ["Jazz", "Classical"],
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "432-325-5432",
-    "seeking_venue": False,
-    "image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    }
-
-  db.session.query(Artist).delete()
-  artists = [Artist(**data1), Artist(**data2), Artist(**data3)]
-  db.session.add_all(artists)
-  db.session.commit()
-
-def add_shows():
-  data=[{
-    "venue_id": 1,
-    "venue_name": "The Musical Hop",
-    "artist_id": 4,
-    "artist_name": "Guns N Petals",
-    "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-    "start_time": "2019-05-21T21:30:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 5,
-    "artist_name": "Matt Quevedo",
-    "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-    "start_time": "2019-06-15T23:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-01T20:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-08T20:00:00.000Z"
-  }, {
-    "venue_id": 3,
-    "venue_name": "Park Square Live Music & Coffee",
-    "artist_id": 6,
-    "artist_name": "The Wild Sax Band",
-    "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-    "start_time": "2035-04-15T20:00:00.000Z"
-  }]
-
-  db.session.query(Show).delete()
-  shows = []
-  for el in data:
-    #el["start_time"] = datetime.strptime(el["start_time"], format_datetime())
-    del el['venue_name']
-    del el['artist_name']
-    del el['artist_image_link']
-    shows.append(Show(**el))
-  db.session.add_all(shows)
-  db.session.commit()
-
-POPULATE = True
-if POPULATE:
-  add_venues()
-  add_artist()
-  add_shows()
-  POPULATE = False
-
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
@@ -0,0 +1,37 @@
+'''
+Benchmark of the datetime filter: parsing the string and formatting it with
+Babel on every call, as the filter used to, against dates.format_datetime
+with its compiled patterns.
+
+    $ python benchmark_dates.py --calls 2000
+'''
+import argparse
+import timeit
+from datetime import datetime
+
+import babel.dates
+import dateutil.parser
+
+import dates
+
+def previous(value, format='full'):
+    return babel.dates.format_datetime(dateutil.parser.parse(value), dates.PATTERNS[format])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000, help='calls per run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each method, the best one counts')
+    args = parser.parse_args()
+
+    value = datetime(2035, 4, 1, 20)
+    methods = [
+        ('previous', lambda: previous(str(value))),
+        ('format_datetime', lambda: dates.format_datetime(value, 'full'))
+    ]
+    print('method\tus_per_call')
+    for name, method in methods:
+        best = min(timeit.repeat(method, number=args.calls, repeat=args.repeat)) / args.calls
+        print('%s\t%.1f' % (name, best * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+#----------------------------------------------------------------------------#
+# Fragment cache.
+#
+# Views cache the data they render under a (route, arguments) key. Every
+# route has a version number that is part of its keys, so invalidating a
+# route is just bumping its version: the old entries are never read again
+# and age out of the backend on their own.
+#----------------------------------------------------------------------------#
+
+class MemoryBackend(object):
+    '''
+    In-process LRU store whose entries expire after a timeout.
+    '''
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.time() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def version(self, route):
+        return self.versions.get(route, 0)
+
+    def incr_version(self, route):
+        with self.lock:
+            self.versions[route] = self.versions.get(route, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class RedisBackend(object):
+    '''
+    Store shared by every worker, on any Redis compatible server.
+    '''
+    def __init__(self, url, prefix='fyyur:'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        self.client.setex(self.prefix + key, int(timeout), pickle.dumps(value))
+
+    def version(self, route):
+        return int(self.client.get(self.prefix + 'version:' + route) or 0)
+
+    def incr_version(self, route):
+        self.client.incr(self.prefix + 'version:' + route)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+class Cache(object):
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.timeout = 60
+        self.counters = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 60)
+        if app.config.get('CACHE_TYPE') == 'redis':
+            if redis is None:
+                app.logger.warning('CACHE_TYPE is redis but the redis package is not installed, using memory')
+            else:
+                self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+                return
+        self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+    def get_or_set(self, route, builder, *args):
+        '''
+        Cached value of `builder(*args)` for `route`, calling the builder
+        only on a miss.
+        '''
+        key = '%s:%d:%r' % (route, self.backend.version(route), args)
+        counters = self.counters.setdefault(route, {'hits': 0, 'misses': 0})
+        value = self.backend.get(key)
+        if value is not None:
+            counters['hits'] += 1
+            return value
+        counters['misses'] += 1
+        value = builder(*args)
+        self.backend.set(key, value, self.timeout)
+        return value
+
+    def invalidate(self, *routes):
+        for route in routes:
+            self.backend.incr_version(route)
+
+    def clear(self):
+        self.backend.clear()
+        self.counters = {}
+
+    def stats(self):
+        '''
+        Hit and miss counters of this process, in total and per route.
+        '''
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': sum(counters['hits'] for counters in self.counters.values()),
+            'misses': sum(counters['misses'] for counters in self.counters.values()),
+            'routes': self.counters
+        }
+
+cache = Cache()
@@ -10,4 +10,45 @@ DEBUG = True
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://acrespo@localhost:5432/fyyur'
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://acrespo@localhost:5432/fyyur')
+
+# Optional read replica for the read-only views, see replica.py. Clients
+# read from the primary for REPLICA_STICKY_SECONDS after writing
+REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else None
+REPLICA_STICKY_SECONDS = 10
+
+# Connection pool of each process, see pool.py. Every gunicorn worker has
+# its own pool, so the database sees up to
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+DB_POOL_SIZE = int(os.environ.get('FYYUR_DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('FYYUR_DB_MAX_OVERFLOW', 10))
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = int(os.environ.get('FYYUR_DB_POOL_TIMEOUT', 30))
+# Seconds after which connections are replaced, and whether they are tested
+# before use, so connections dropped by the server or a proxy are not used
+DB_POOL_RECYCLE = int(os.environ.get('FYYUR_DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('FYYUR_DB_POOL_PRE_PING', '1') == '1'
+# Milliseconds after which Postgres cancels a statement
+DB_STATEMENT_TIMEOUT = int(os.environ.get('FYYUR_DB_STATEMENT_TIMEOUT', 30000))
+
+# Cache of the home and listing pages data, see cache.py.
+# CACHE_TYPE is 'memory' (per process LRU) or 'redis'
+CACHE_TYPE = 'memory'
+CACHE_REDIS_URL = 'redis://localhost:6379/0'
+CACHE_DEFAULT_TIMEOUT = 60
+CACHE_MAX_ENTRIES = 1024
+
+# Write-behind mode, see writes.py. When enabled, submissions are queued in
+# a local SQLite file and applied to the database by a background worker
+WRITE_BEHIND = os.environ.get('FYYUR_WRITE_BEHIND') == '1'
+WRITE_QUEUE_PATH = os.path.join(basedir, 'write_queue.sqlite3')
+WRITE_BATCH_SIZE = 100
+WRITE_POLL_INTERVAL = 0.5
+
+# Query profiler, see profiler.py. Statements repeated PROFILER_N_PLUS_ONE
+# times in one request are logged, as are requests running more than
+# PROFILER_QUERY_BUDGET queries (None for no budget)
+PROFILER_ENABLED = True
+PROFILER_N_PLUS_ONE = 5
+PROFILER_QUERY_BUDGET = None
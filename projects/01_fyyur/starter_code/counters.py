@@ -0,0 +1,134 @@
+from datetime import datetime
+
+from sqlalchemy import and_, event, func, select
+
+from models import db, Venue, Artist, Show, ShowCounters, FeedSequence
+from replica import RoutingSession
+from cache import cache
+import dates
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#
+# Venue and Artist rows carry their numbers of upcoming and past shows, so
+# listings read two columns instead of aggregating the Show table. Shows
+# starting before the sweep time of ShowCounters count as past, the others
+# as upcoming. Inserting or deleting a show through the ORM updates the
+# counters of its venue and artist in the same transaction, and a periodic sweep (flask fyyur sweep-shows) moves the
+# shows that started since the previous sweep from upcoming to past.
+#----------------------------------------------------------------------------#
+
+COUNTED = ((Venue, Show.venue_id), (Artist, Show.artist_id))
+
+def swept_at(connection, lock=False):
+    '''
+    Time of the last sweep, the first use of the counters being the first
+    sweep. With `lock` the row stays locked until the end of the transaction.
+    '''
+    table = ShowCounters.__table__
+    query = select([table.c.swept_at]).where(table.c.id == 1)
+    # Show inserts share the lock, a sweep waits for them and vice versa
+    value = connection.execute(query.with_for_update(read=not lock)).scalar()
+    if value is None:
+        value = datetime.now()
+        connection.execute(table.insert().values(id=1, swept_at=value))
+    return value
+
+def _shift(connection, show, step):
+    if dates.to_naive_utc(show.start_time) >= swept_at(connection):
+        column = 'num_upcoming_shows'
+    else:
+        column = 'num_past_shows'
+    for model, id in ((Venue, show.venue_id), (Artist, show.artist_id)):
+        table = model.__table__
+        connection.execute(table.update().where(table.c.id == id).values({column: table.c[column] + step}))
+
+@event.listens_for(Show, 'after_insert')
+def show_inserted(mapper, connection, show):
+    _shift(connection, show, 1)
+
+@event.listens_for(Show, 'after_delete')
+def show_deleted(mapper, connection, show):
+    _shift(connection, show, -1)
+
+def _count(fk, model, criterion):
+    return select([func.count(Show.id)]).where(fk == model.id).where(criterion).scalar_subquery()
+
+def recount():
+    '''
+    Recompute every counter from the Show table, needed after inserting
+    shows without the ORM, as the importer does.
+    '''
+    since = swept_at(db.session.connection(), lock=True)
+    for model, fk in COUNTED:
+        db.session.execute(model.__table__.update().values(
+            num_upcoming_shows=_count(fk, model, Show.start_time >= since),
+            num_past_shows=_count(fk, model, Show.start_time < since)
+        ).execution_options(bump_feed_version=False))
+    db.session.commit()
+    cache.invalidate('venues')
+
+def sweep(now=None):
+    '''
+    Count the shows that started since the previous sweep as past instead of
+    upcoming, only updating the venues and artists of these shows. Returns
+    the number of shows moved.
+    '''
+    if now is None:
+        now = datetime.now()
+    since = swept_at(db.session.connection(), lock=True)
+    if now <= since:
+        db.session.rollback()
+        return 0
+
+    started = and_(Show.start_time >= since, Show.start_time < now)
+    moved = db.session.query(func.count(Show.id)).filter(started).scalar()
+    if moved:
+        for model, fk in COUNTED:
+            started_count = _count(fk, model, started)
+            db.session.execute(model.__table__.update().
+                where(model.id.in_(select([fk]).where(started))).
+                values(
+                    num_upcoming_shows=model.num_upcoming_shows - started_count,
+                    num_past_shows=model.num_past_shows + started_count
+                ).execution_options(bump_feed_version=False))
+    table = ShowCounters.__table__
+    db.session.execute(table.update().where(table.c.id == 1).values(swept_at=now))
+    db.session.commit()
+    if moved:
+        cache.invalidate('venues')
+    return moved
+
+#----------------------------------------------------------------------------#
+# Feed sequence.
+#
+# Every transaction writing to the venues, artists or shows increments the
+# version of FeedSequence, which versions the show feeds. The increment
+# locks the row until the commit, so versions follow the commit order, and
+# a feed checks a single row to answer a 304.
+#----------------------------------------------------------------------------#
+
+FEED_TABLES = frozenset((Venue.__table__, Artist.__table__, Show.__table__))
+
+def bump_feed_version(connection):
+    table = FeedSequence.__table__
+    now = datetime.utcnow()
+    bumped = connection.execute(table.update().where(table.c.id == 1).values(version=table.c.version + 1, update_time=now))
+    if bumped.rowcount == 0:
+        connection.execute(table.insert().values(id=1, version=1, update_time=now))
+
+@event.listens_for(RoutingSession, 'after_flush')
+def flushed(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(instance, (Venue, Artist, Show)) for instance in changed):
+        bump_feed_version(session.connection())
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def executed(orm_execute_state):
+    # Bulk statements, such as the inserts of the importer and query.update().
+    # The counter updates above, which feeds don't show, opt out
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if getattr(orm_execute_state.statement, 'table', None) in FEED_TABLES and \
+            orm_execute_state.execution_options.get('bump_feed_version', True):
+        bump_feed_version(orm_execute_state.session.connection())
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+
+#----------------------------------------------------------------------------#
+# Date formatting.
+#
+# Babel patterns and locales are compiled once per (format, locale) instead
+# of on every call, datetime values are formatted as they are and strings
+# are only parsed the first time they are seen.
+#----------------------------------------------------------------------------#
+
+PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma"
+}
+
+@lru_cache(maxsize=64)
+def compile_format(format, locale=None):
+    '''
+    (pattern, locale) pair ready to format with, for a named format of
+    PATTERNS or any Babel pattern.
+    '''
+    pattern = babel.dates.parse_pattern(PATTERNS.get(format, format))
+    return pattern, Locale.parse(locale or babel.dates.LC_TIME)
+
+@lru_cache(maxsize=4096)
+def parse(value):
+    return dateutil.parser.parse(value)
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return parse(value)
+
+def to_naive_utc(value):
+    '''
+    `value` as a naive datetime, as start times are stored, converted to UTC
+    when it has a zone.
+    '''
+    date = to_datetime(value)
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+def apply(pattern, locale, value):
+    date = to_datetime(value)
+    if date.tzinfo is None:
+        # As babel.dates.format_datetime does, naive values are taken as UTC
+        date = date.replace(tzinfo=babel.dates.UTC)
+    return pattern.apply(date, locale)
+
+def format_datetime(value, format='medium', locale=None):
+    pattern, locale = compile_format(format, locale)
+    return apply(pattern, locale, value)
+
+def format_datetimes(values, format='medium', locale=None):
+    '''
+    Formatted text of every value, looking the pattern up only once.
+    '''
+    pattern, locale = compile_format(format, locale)
+    return [apply(pattern, locale, value) for value in values]
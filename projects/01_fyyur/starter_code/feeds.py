@@ -0,0 +1,138 @@
+import csv
+import io
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+from werkzeug.http import is_resource_modified
+
+from models import Show
+from replica import use_replica
+import queries
+import schedule
+
+#----------------------------------------------------------------------------#
+# Show feeds.
+#
+# Every show, or those of one venue or artist, as CSV or iCalendar. Feeds
+# are streamed from a server side cursor, and carry an ETag from the feed
+# sequence, see counters, so that polling clients get a 304 without the
+# shows being read at all.
+#----------------------------------------------------------------------------#
+
+CHUNK_SIZE = 16 * 1024
+
+FIELDS = ['id', 'start_time', 'venue_id', 'venue_name', 'artist_id', 'artist_name']
+
+feeds = Blueprint('feeds', __name__)
+# Every endpoint only reads
+feeds.before_request(use_replica)
+
+def buffered(lines):
+    '''
+    Join `lines` into chunks of about CHUNK_SIZE characters.
+    '''
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk)
+
+def csv_lines(shows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for show in shows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(dict(show, start_time=show['start_time'].isoformat()))
+        yield buffer.getvalue()
+
+def ics_text(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def ics_line(line):
+    '''
+    `line` folded every 75 octets as RFC 5545 requires.
+    '''
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while data:
+        size = 75 if not parts else 74
+        # Don't split a multi-byte character
+        while size < len(data) and (data[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(data[:size].decode('utf-8'))
+        data = data[size:]
+    return '\r\n '.join(parts) + '\r\n'
+
+def ics_time(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+def ics_lines(shows, stamp):
+    yield ics_line('BEGIN:VCALENDAR')
+    yield ics_line('VERSION:2.0')
+    yield ics_line('PRODID:-//Fyyur//Shows//EN')
+    for show in shows:
+        yield ''.join([
+            ics_line('BEGIN:VEVENT'),
+            ics_line('UID:show-%d@fyyur' % show['id']),
+            ics_line('DTSTAMP:%sZ' % stamp),
+            ics_line('DTSTART:%s' % ics_time(show['start_time'])),
+            ics_line('DTEND:%s' % ics_time(show['start_time'] + schedule.SHOW_LENGTH)),
+            ics_line('SUMMARY:%s' % ics_text('%s at %s' % (show['artist_name'], show['venue_name']))),
+            ics_line('LOCATION:%s' % ics_text(show['venue_name'])),
+            ics_line('END:VEVENT')
+        ])
+    yield ics_line('END:VCALENDAR')
+
+def feed(format, scope, criterion=None, version=None):
+    '''
+    Streamed CSV or iCalendar feed of the shows matching `criterion`, or a
+    304 when the client copy, of `version`, is still current. The ETag
+    alone says so: the feed sequence follows the commit order, its update
+    time doesn't, so there is no Last-Modified date to revalidate with.
+    '''
+    headers = {}
+    update_time = None
+    if version is not None:
+        version, update_time = version
+        etag = '%s-%s-%s' % (scope, format, version)
+        if not is_resource_modified(request.environ, etag=etag):
+            return Response(status=304, headers={'ETag': '"%s"' % etag})
+        headers['ETag'] = '"%s"' % etag
+
+    shows = queries.stream('shows', FIELDS, criterion)
+    if format == 'csv':
+        lines = csv_lines(shows)
+        mimetype = 'text/csv'
+    else:
+        stamp = ics_time(update_time) if update_time else '19700101T000000'
+        lines = ics_lines(shows, stamp)
+        mimetype = 'text/calendar'
+    return Response(stream_with_context(buffered(lines)), mimetype=mimetype, headers=headers)
+
+@feeds.route('/shows.<any(csv, ics):format>')
+def shows_feed(format):
+    return feed(format, 'shows', version=queries.shows_version())
+
+@feeds.route('/venues/<int:venue_id>/shows.<any(csv, ics):format>')
+def venue_shows_feed(venue_id, format):
+    version = queries.shows_version(venue_id=venue_id)
+    if version is None:
+        abort(404)
+    return feed(format, 'venue-%d' % venue_id, Show.venue_id == venue_id, version)
+
+@feeds.route('/artists/<int:artist_id>/shows.<any(csv, ics):format>')
+def artist_shows_feed(artist_id, format):
+    version = queries.shows_version(artist_id=artist_id)
+    if version is None:
+        abort(404)
+    return feed(format, 'artist-%d' % artist_id, Show.artist_id == artist_id, version)
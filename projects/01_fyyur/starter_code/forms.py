@@ -3,20 +3,79 @@ from flask_wtf import Form
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, TextAreaField
 from wtforms.validators import DataRequired, AnyOf, URL, Length, Regexp, Optional
 from models import Artist, Venue
+from cache import cache
+import queries
+
+GENRES = [
+    'Alternative',
+    'Blues',
+    'Classical',
+    'Country',
+    'Electronic',
+    'Folk',
+    'Funk',
+    'Hip-Hop',
+    'Heavy Metal',
+    'Instrumental',
+    'Jazz',
+    'Musical Theatre',
+    'Pop',
+    'Punk',
+    'R&B',
+    'Reggae',
+    'Rock n Roll',
+    'Soul',
+    'Swing',
+    'Other',
+]
+
+GENRE_CHOICES = [(genre, genre) for genre in GENRES]
+
+# Canonical genre name by lowercase name or URL slug, e.g. 'rock-n-roll'
+GENRE_LOOKUP = dict(
+    [(genre.lower(), genre) for genre in GENRES] +
+    [(genre.lower().replace(' ', '-'), genre) for genre in GENRES]
+)
+
+def lookup_genre(name):
+    '''
+    Canonical name of the genre `name` refers to, None if it is not a genre.
+    '''
+    return GENRE_LOOKUP.get(name.strip().lower())
 
 class ShowForm(Form):
-    artist_id = SelectField()
-    venue_id = SelectField()
+    artist_id = SelectField(coerce=int)
+    venue_id = SelectField(coerce=int)
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default= datetime.today()
     )
 
-    def __init__(self):
-        super(ShowForm, self).__init__()
-        self.artist_id.choices = [(s.id, s.name) for s in Artist.query.all()]
-        self.venue_id.choices = [(v.id, v.name) for v in Venue.query.all()]
+    def __init__(self, *args, artist_choices=None, venue_choices=None, **kwargs):
+        '''
+        The artist and venue choices default to every artist and venue.
+        Callers validating many shows pass their own, smaller, choices.
+        '''
+        super(ShowForm, self).__init__(*args, **kwargs)
+        if artist_choices is None:
+            artist_choices = self.load_choices(self.artist_id, Artist, 'artist_choices')
+        if venue_choices is None:
+            venue_choices = self.load_choices(self.venue_id, Venue, 'venue_choices')
+        self.artist_id.choices = artist_choices
+        self.venue_id.choices = venue_choices
+
+    def load_choices(self, field, model, route):
+        '''
+        Cached (id, name) choices of `model`. When there are too many to list,
+        the field is flagged for autocompletion and only offers the submitted
+        id, if it exists.
+        '''
+        choices, complete = cache.get_or_set(route, queries.choices, model)
+        field.autocomplete = not complete
+        if complete:
+            return choices
+        return queries.choice(model, field.data)
 
 class VenueForm(Form):
     name = StringField(
@@ -88,29 +147,8 @@ class VenueForm(Form):
         'phone', validators=[Optional(), Regexp(regex=r'^[0-9]{3}-[0-9]{3}-[0-9]{4}$', message='Invalid phone number')]
     )
     genres = SelectMultipleField(
-        # TODO implement enum restriction
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        choices=GENRE_CHOICES
     )
     image_link = StringField(
         'image_link', validators=[Optional(), Length(max=500), URL()]
@@ -195,29 +233,8 @@ class ArtistForm(Form):
         'phone', validators=[Optional(), Regexp(regex=r"^[0-9]{3}-[0-9]{3}-[0-9]{4}$", message='Invalid phone number')]
     )
     genres = SelectMultipleField(
-        # TODO implement enum restriction
         'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+        choices=GENRE_CHOICES
     )
     image_link = StringField(
         'image_link', validators=[Optional(), Length(max=500), URL()]
@@ -0,0 +1,197 @@
+import csv
+import json
+import os
+from itertools import islice
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+from werkzeug.datastructures import MultiDict
+
+from models import db, Venue, Artist, Show
+from forms import VenueForm, ArtistForm, ShowForm
+from cache import cache
+import counters
+import schedule
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+# Files are read as a stream and written in chunks, so memory stays bounded
+# whatever the size of the file. Every row goes through the same form used
+# by the create pages, shows are checked for overlaps as bookings are, and
+# invalid rows are reported and skipped.
+#----------------------------------------------------------------------------#
+
+CHUNK_SIZE = 1000
+
+MODELS = {
+    'venues': Venue,
+    'artists': Artist,
+    'shows': Show
+}
+
+def read_rows(path):
+    '''
+    Rows of a CSV or JSON Lines file as dicts, one at a time. In CSV files
+    multiple genres are separated by commas.
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='') as f:
+        if extension == '.csv':
+            for row in csv.DictReader(f):
+                if row.get('genres'):
+                    row['genres'] = [genre.strip() for genre in row['genres'].split(',')]
+                yield row
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise click.BadParameter('%s is neither a .csv nor a .jsonl file' % path)
+
+def to_formdata(row):
+    formdata = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        for item in (value if isinstance(value, list) else [value]):
+            formdata.add(key, str(item))
+    return formdata
+
+class Validator(object):
+    '''
+    Validates rows of one kind with its form and turns the valid ones into
+    column mappings ready for insertion.
+    '''
+    def __init__(self, kind):
+        self.kind = kind
+        self.columns = set(MODELS[kind].__table__.columns.keys())
+        if kind == 'shows':
+            # Loaded once, the form of each show is then only given the
+            # ids it refers to, when they exist
+            self.artist_ids = set(id for (id,) in db.session.query(Artist.id))
+            self.venue_ids = set(id for (id,) in db.session.query(Venue.id))
+
+    def form(self, formdata):
+        meta = {'csrf': False}
+        if self.kind == 'venues':
+            return VenueForm(formdata, meta=meta)
+        if self.kind == 'artists':
+            return ArtistForm(formdata, meta=meta)
+        return ShowForm(
+            formdata,
+            meta=meta,
+            artist_choices=self.choices(formdata.get('artist_id'), self.artist_ids),
+            venue_choices=self.choices(formdata.get('venue_id'), self.venue_ids)
+        )
+
+    def choices(self, value, ids):
+        try:
+            id = int(value)
+        except (TypeError, ValueError):
+            return []
+        return [(id, id)] if id in ids else []
+
+    def validate(self, row):
+        '''
+        (mapping, None) for a valid row, (None, errors) otherwise.
+        '''
+        form = self.form(to_formdata(row))
+        if not form.validate():
+            return None, form.errors
+        mapping = dict((key, value) for key, value in form.data.items() if key in self.columns)
+        if row.get('id'):
+            mapping['id'] = int(row['id'])
+        return mapping, None
+
+def reset_sequence(table):
+    '''
+    Move the id sequence of `table` past its largest id, needed on Postgres
+    after inserting rows with explicit ids.
+    '''
+    if db.engine.dialect.name != 'postgresql':
+        return
+    db.session.execute(text(
+        'SELECT setval(pg_get_serial_sequence(\'"{0}"\', \'id\'), COALESCE(MAX(id), 1)) FROM "{0}"'.format(table.name)
+    ))
+    db.session.commit()
+
+def import_file(kind, path, chunk_size=CHUNK_SIZE, report=print):
+    '''
+    Import the `kind` rows of `path`, `chunk_size` rows per insert statement
+    and transaction. Returns the (imported, rejected) row counts.
+    '''
+    validator = Validator(kind)
+    table = MODELS[kind].__table__
+    imported = 0
+    rejected = 0
+    explicit_ids = False
+    rows = enumerate(read_rows(path), 1)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        lines = []
+        mappings = []
+        for line, row in chunk:
+            mapping, errors = validator.validate(row)
+            if errors:
+                rejected += 1
+                report('Row %d rejected: %s' % (line, errors))
+            else:
+                lines.append(line)
+                mappings.append(mapping)
+        if kind == 'shows' and mappings:
+            # Overlapping shows are invalid rows too, and would break the
+            # exclusion constraints of the Show table on Postgres
+            conflicts = schedule.check_schedule(mappings)
+            for conflict in conflicts:
+                rejected += 1
+                report('Row %d rejected: %s' % (lines[conflict['index']], conflict['error']))
+            overlapping = set(conflict['index'] for conflict in conflicts)
+            mappings = [mapping for index, mapping in enumerate(mappings) if index not in overlapping]
+        # One executemany per chunk, two if only some rows have an id
+        with_ids = [mapping for mapping in mappings if 'id' in mapping]
+        without_ids = [mapping for mapping in mappings if 'id' not in mapping]
+        for group in (with_ids, without_ids):
+            if group:
+                db.session.execute(table.insert(), group)
+        db.session.commit()
+        imported += len(mappings)
+        explicit_ids = explicit_ids or bool(with_ids)
+    if explicit_ids:
+        reset_sequence(table)
+    if kind == 'shows' and imported:
+        # Inserted without the ORM, so without updating the show counters
+        counters.recount()
+    cache.invalidate('index', 'venues', 'artists', 'shows', 'venue_choices', 'artist_choices')
+    return imported, rejected
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+fyyur_cli = AppGroup('fyyur', help='Fyyur data management commands.')
+
+@fyyur_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(MODELS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True, help='Rows per insert.')
+def import_command(kind, path, chunk_size):
+    '''Import venues, artists or shows from a CSV or JSON Lines file.'''
+    imported, rejected = import_file(kind, path, chunk_size, report=click.echo)
+    click.echo('Imported %d %s, rejected %d.' % (imported, kind, rejected))
+
+@fyyur_cli.command('sweep-shows')
+def sweep_shows_command():
+    '''Count the shows started since the last sweep as past shows, run it periodically.'''
+    click.echo('Moved %d shows to the past.' % counters.sweep())
+
+@fyyur_cli.command('recount-shows')
+def recount_shows_command():
+    '''Recompute the show counters of every venue and artist.'''
+    counters.recount()
+    click.echo('Recounted the shows of every venue and artist.')
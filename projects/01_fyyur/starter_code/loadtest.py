@@ -0,0 +1,98 @@
+'''
+Load test of Fyyur under gunicorn for several connection pool sizes.
+
+For every pool size, starts `gunicorn --workers W --threads T app:app` with
+FYYUR_DB_POOL_SIZE set, sends requests from concurrent clients for a while
+and reports the throughput, the latency and the pool statistics of one
+worker. Needs gunicorn and a seeded Postgres database:
+
+    $ flask fyyur seed --generate 10000
+    $ python loadtest.py --pool-sizes 1,2,5,10 --workers 4 --threads 8
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+PATHS = ['/', '/venues', '/artists', '/shows', '/venues/1', '/artists/1', '/api/v1/venues?fields=id,name']
+
+def wait_until_up(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url + '/pool/stats', timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start at %s' % url)
+
+def client(url, deadline, latencies, errors):
+    i = 0
+    while time.time() < deadline:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            urllib.request.urlopen(url + path, timeout=30).read()
+            latencies.append(time.perf_counter() - start)
+        except (urllib.error.URLError, ConnectionError):
+            errors.append(path)
+
+def run(args, pool_size):
+    url = 'http://127.0.0.1:%d' % args.port
+    env = dict(os.environ, FYYUR_DB_POOL_SIZE=str(pool_size), FYYUR_DB_MAX_OVERFLOW='0')
+    server = subprocess.Popen([
+        'gunicorn', '--workers', str(args.workers), '--threads', str(args.threads),
+        '--bind', '127.0.0.1:%d' % args.port, 'app:app'
+    ], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(url)
+        latencies = []
+        errors = []
+        deadline = time.time() + args.duration
+        clients = [threading.Thread(target=client, args=(url, deadline, latencies, errors)) for _ in range(args.clients)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        stats = json.loads(urllib.request.urlopen(url + '/pool/stats').read())
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    return {
+        'pool_size': pool_size,
+        'requests_per_second': round(len(latencies) / args.duration, 1),
+        'p50_ms': round(1000 * latencies[len(latencies) // 2], 1) if latencies else None,
+        'p99_ms': round(1000 * latencies[int(len(latencies) * 0.99)], 1) if latencies else None,
+        'errors': len(errors),
+        'avg_wait_ms': stats.get('avg_wait_ms'),
+        'max_wait_ms': stats.get('max_wait_ms'),
+        'timeouts': stats.get('timeouts')
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pool-sizes', default='1,2,5,10', help='comma separated pool sizes to compare')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads of each worker')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent clients')
+    parser.add_argument('--duration', type=int, default=20, help='seconds per pool size')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    columns = ['pool_size', 'requests_per_second', 'p50_ms', 'p99_ms', 'errors', 'avg_wait_ms', 'max_wait_ms', 'timeouts']
+    print('\t'.join(columns))
+    for pool_size in [int(size) for size in args.pool_sizes.split(',')]:
+        result = run(args, pool_size)
+        print('\t'.join(str(result[column]) for column in columns))
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Adding show booking exclusion constraints
+
+Revision ID: b7e3a91c5d42
+Revises: e81f4c29b6d0
+Create Date: 2020-05-08 10:15:32.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a91c5d42'
+down_revision = 'e81f4c29b6d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # No two shows of a venue, or of an artist, may overlap. A show lasts
+    # schedule.SHOW_LENGTH, the GiST indexes behind the constraints answer
+    # the overlap checks in logarithmic time
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute('''
+        ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_venue_id_booking"
+        EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, start_time + interval '2 hours') WITH &&)
+    ''')
+    op.execute('''
+        ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_artist_id_booking"
+        EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, start_time + interval '2 hours') WITH &&)
+    ''')
+
+
+def downgrade():
+    op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_artist_id_booking"')
+    op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_venue_id_booking"')
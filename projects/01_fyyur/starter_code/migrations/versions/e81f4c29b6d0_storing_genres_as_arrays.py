@@ -0,0 +1,36 @@
+"""Storing Venue and Artist genres as arrays
+
+Revision ID: e81f4c29b6d0
+Revises: c5d81e0a3f27
+Create Date: 2020-05-06 09:27:13.640192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'e81f4c29b6d0'
+down_revision = 'c5d81e0a3f27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Genres were saved as the text of a Postgres array, e.g. {Jazz,"Rock n Roll"},
+    # so the data migration is a plain cast of the existing values
+    for table in ['Venue', 'Artist']:
+        op.alter_column(table, 'genres',
+                   existing_type=sa.String(length=120),
+                   type_=postgresql.ARRAY(sa.String(length=120)),
+                   postgresql_using="CASE WHEN genres = '' THEN NULL ELSE genres::varchar(120)[] END")
+        op.create_index('ix_%s_genres' % table, table, ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    for table in ['Artist', 'Venue']:
+        op.drop_index('ix_%s_genres' % table, table_name=table)
+        op.alter_column(table, 'genres',
+                   existing_type=postgresql.ARRAY(sa.String(length=120)),
+                   type_=sa.String(length=120),
+                   postgresql_using='genres::varchar(120)')
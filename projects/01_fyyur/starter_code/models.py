@@ -1,14 +1,34 @@
 from flask import Flask
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SQLAlchemy as BaseSQLAlchemy
+from sqlalchemy import orm
 from sqlalchemy.sql import func
+from sqlalchemy.dialects import postgresql
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
+from pool import engine_options
+from replica import RoutingSession
 
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
+class SQLAlchemy(BaseSQLAlchemy):
+    '''
+    Sizes the connection pool and sets the statement timeout of Postgres
+    engines from the DB_* settings of config.py, and routes the read-only
+    views to the replica, see replica.py.
+    '''
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super(SQLAlchemy, self).apply_driver_hacks(app, sa_url, options)
+        if sa_url.drivername.startswith('postgresql'):
+            for key, value in engine_options(app.config).items():
+                options.setdefault(key, value)
+        return sa_url, options
+
 csrf = CSRFProtect()
 app = Flask(__name__)
 moment = Moment(app)
@@ -24,6 +44,9 @@ migrate = Migrate(app, db)
 # Models.
 #----------------------------------------------------------------------------#
 
+# Postgres array of genre names. SQLite, used by the tests, stores it as JSON
+GenreList = postgresql.ARRAY(db.String(120)).with_variant(db.JSON(), 'sqlite')
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
 
@@ -33,7 +56,7 @@ class Venue(db.Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.Column(GenreList)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
@@ -41,6 +64,16 @@ class Venue(db.Model):
     seeking_description = db.Column(db.String(500))
     shows = db.relationship('Show', backref="venue", lazy=True)
     create_time = db.Column(db.DateTime(), default=func.now(), nullable=False)
+    # Maintained by the counters module, see there
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    num_past_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+        db.Index('ix_Venue_create_time', 'create_time'),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+    )
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
@@ -50,7 +83,7 @@ class Artist(db.Model):
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.Column(GenreList)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
@@ -58,6 +91,15 @@ class Artist(db.Model):
     seeking_description = db.Column(db.String(500))
     shows = db.relationship('Show', backref="artist", lazy=True)
     create_time = db.Column(db.DateTime(), default=func.now(), nullable=False)
+    # Maintained by the counters module, see there
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    num_past_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_create_time', 'create_time'),
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+    )
 
 class Show(db.Model):
     __tablename__ = 'Show'
@@ -66,3 +108,30 @@ class Show(db.Model):
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    )
+
+class ShowCounters(db.Model):
+    '''
+    Single row holding the time the show counters were last swept at: shows
+    starting before it are counted as past, the others as upcoming.
+    '''
+    __tablename__ = 'ShowCounters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    swept_at = db.Column(db.DateTime, nullable=False)
+
+class FeedSequence(db.Model):
+    '''
+    Single row numbering the changes to the venues, artists and shows, which
+    versions the show feeds, see counters.
+    '''
+    __tablename__ = 'FeedSequence'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)
+    update_time = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+#----------------------------------------------------------------------------#
+# Connection pool.
+#
+# Postgres engines use TimedQueuePool, a QueuePool measuring how long
+# requests wait for a connection. Its numbers, together with the pool
+# occupancy, are served at /pool/stats. They are per process: with several
+# gunicorn workers each one reports its own pool.
+#----------------------------------------------------------------------------#
+
+class PoolStats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self):
+        with self.lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(1000 * self.total_wait / attempts, 3) if attempts else 0.0,
+                'max_wait_ms': round(1000 * self.max_wait, 3)
+            }
+
+stats = PoolStats()
+
+class TimedQueuePool(QueuePool):
+    '''
+    QueuePool recording the time taken by every checkout in `stats`,
+    including opening new connections and waiting for a free one.
+    '''
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super(TimedQueuePool, self)._do_get()
+        except TimeoutError:
+            stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        stats.record(time.perf_counter() - start)
+        return connection
+
+def engine_options(config):
+    '''
+    create_engine options of the DB_* settings, for Postgres engines.
+    '''
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'connect_args': {'options': '-c statement_timeout=%d' % config.get('DB_STATEMENT_TIMEOUT', 30000)}
+    }
+
+def pool_status(engine):
+    '''
+    Occupancy of the pool of `engine` and the checkout statistics.
+    '''
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0)
+        })
+    status.update(stats.as_dict())
+    return status
@@ -0,0 +1,379 @@
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import cast, func, tuple_
+
+from models import db, Venue, Artist, Show, FeedSequence
+import search
+
+#----------------------------------------------------------------------------#
+# Query layer.
+#
+# Every function here builds the data for one view with a constant number
+# of SQL statements, independently of how many rows the tables hold.
+#----------------------------------------------------------------------------#
+
+SHOWS_PER_PAGE = 30
+CHOICES_LIMIT = 1000
+AUTOCOMPLETE_LIMIT = 20
+
+def latest(model, limit=10):
+    '''
+    The `limit` most recently created venues or artists, newest first.
+    '''
+    rows = db.session.query(model.id, model.name, model.create_time).\
+        order_by(model.create_time.desc()).\
+        limit(limit).\
+        all()
+    return [{'id': row.id, 'name': row.name, 'create_time': row.create_time} for row in rows]
+
+def artist_list():
+    '''
+    Every artist ordered by id.
+    '''
+    rows = db.session.query(Artist.id, Artist.name).order_by(Artist.id.asc()).all()
+    return [{'id': row.id, 'name': row.name} for row in rows]
+
+def choices(model, limit=CHOICES_LIMIT):
+    '''
+    (choices, complete) where choices are the (id, name) pairs of the venues
+    or artists ordered by name. When there are more than `limit` rows only
+    the first ones are read and complete is False: forms should then ask for
+    the id with autocompletion rather than list every row.
+    '''
+    rows = db.session.query(model.id, model.name).order_by(model.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        return [], False
+    return sorted([(row.id, row.name) for row in rows], key=lambda choice: choice[1]), True
+
+def choice(model, id):
+    '''
+    The (id, name) choices of the venue or artist `id`, empty if there is none.
+    '''
+    if id is None:
+        return []
+    return [(row.id, row.name) for row in db.session.query(model.id, model.name).filter(model.id == id)]
+
+def autocomplete(model, term, limit=AUTOCOMPLETE_LIMIT):
+    '''
+    The best `limit` venues or artists whose name matches `term`.
+    '''
+    rows = db.session.query(model.id, model.name).\
+        filter(search.match(model.name, term)).\
+        order_by(*search.rank(model.name, term)).\
+        limit(limit).\
+        all()
+    return [{'id': row.id, 'name': row.name} for row in rows]
+
+def venue_areas():
+    '''
+    Venues grouped by city/state with their number of upcoming shows, read
+    from the show counters of the Venue table.
+    '''
+    rows = db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        Venue.num_upcoming_shows
+    ).order_by(Venue.state, Venue.city, Venue.id).all()
+
+    areas = []
+    for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state)):
+        areas.append({
+            'city': city,
+            'state': state,
+            'venues': [{
+                'id': venue.id,
+                'name': venue.name,
+                'num_upcoming_shows': venue.num_upcoming_shows
+            } for venue in venues]
+        })
+    return areas
+
+def _matches(model, criterion, order_by):
+    '''
+    Rows of `model` matching `criterion` with their upcoming shows count and
+    the total number of matches, all from one statement. The total is a
+    window count over the matching rows so no extra COUNT query runs.
+    '''
+    rows = db.session.query(
+        model.id,
+        model.name,
+        model.num_upcoming_shows,
+        func.count().over().label('total')
+    ).filter(criterion).\
+        order_by(*order_by).\
+        all()
+
+    return {
+        'count': rows[0].total if rows else 0,
+        'data': [{
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.num_upcoming_shows
+        } for row in rows]
+    }
+
+def search_venues(term):
+    '''
+    Venues whose name matches `term`, best match first, see the search module.
+    '''
+    return _matches(Venue, search.match(Venue.name, term), search.rank(Venue.name, term))
+
+def search_artists(term):
+    '''
+    Artists whose name matches `term`, best match first, see the search module.
+    '''
+    return _matches(Artist, search.match(Artist.name, term), search.rank(Artist.name, term))
+
+def has_genre(column, genre):
+    '''
+    Criterion matching the rows whose genres include `genre`. On Postgres it
+    is an array containment answered by the GIN index on the column.
+    '''
+    if search.is_postgres():
+        return column.contains([genre])
+    return cast(column, db.String).like('%"' + genre + '"%')
+
+def venues_by_genre(genre):
+    return _matches(Venue, has_genre(Venue.genres, genre), [Venue.name, Venue.id])
+
+def artists_by_genre(genre):
+    return _matches(Artist, has_genre(Artist.genres, genre), [Artist.name, Artist.id])
+
+def _genres(genres):
+    return list(genres) if genres else []
+
+def _partition_shows(rows, now, format_show):
+    '''
+    Split joined (entity, show...) rows into past and upcoming shows in one
+    pass. Rows coming from the outer join without any show are skipped.
+    '''
+    past_shows = []
+    upcoming_shows = []
+    for row in rows:
+        if row.start_time is None:
+            continue
+        if row.start_time < now:
+            past_shows.append(format_show(row))
+        else:
+            upcoming_shows.append(format_show(row))
+    return past_shows, upcoming_shows
+
+def venue_detail(venue_id, now=None):
+    '''
+    Venue page data with its past and upcoming shows, loaded together with
+    the artists playing them in a single statement. None if not found.
+    '''
+    if now is None:
+        now = datetime.now()
+
+    rows = db.session.query(
+        Venue,
+        Show.start_time,
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).outerjoin(Show, Show.venue_id == Venue.id).\
+        outerjoin(Artist, Artist.id == Show.artist_id).\
+        filter(Venue.id == venue_id).\
+        order_by(Show.start_time).\
+        all()
+
+    if not rows:
+        return None
+
+    venue = rows[0].Venue
+    past_shows, upcoming_shows = _partition_shows(rows, now, lambda row: {
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time
+    })
+
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'city': venue.city,
+        'state': venue.state,
+        'address': venue.address,
+        'phone': venue.phone,
+        'genres': _genres(venue.genres),
+        'image_link': venue.image_link,
+        'facebook_link' : venue.facebook_link,
+        'website': venue.website,
+        'seeking_talent': venue.seeking_talent,
+        'seeking_description': venue.seeking_description,
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+def artist_detail(artist_id, now=None):
+    '''
+    Artist page data with its past and upcoming shows, loaded together with
+    the venues hosting them in a single statement. None if not found.
+    '''
+    if now is None:
+        now = datetime.now()
+
+    rows = db.session.query(
+        Artist,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link')
+    ).outerjoin(Show, Show.artist_id == Artist.id).\
+        outerjoin(Venue, Venue.id == Show.venue_id).\
+        filter(Artist.id == artist_id).\
+        order_by(Show.start_time).\
+        all()
+
+    if not rows:
+        return None
+
+    artist = rows[0].Artist
+    past_shows, upcoming_shows = _partition_shows(rows, now, lambda row: {
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'venue_image_link': row.venue_image_link,
+        'start_time': row.start_time
+    })
+
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'city': artist.city,
+        'state': artist.state,
+        'phone': artist.phone,
+        'genres': _genres(artist.genres),
+        'image_link': artist.image_link,
+        'facebook_link' : artist.facebook_link,
+        'website': artist.website,
+        'seeking_venue': artist.seeking_venue,
+        'seeking_description': artist.seeking_description,
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+def encode_cursor(start_time, show_id):
+    return '%s_%d' % (start_time.strftime('%Y-%m-%dT%H:%M:%S.%f'), show_id)
+
+def decode_cursor(cursor):
+    '''
+    (start_time, show id) position encoded in a /shows cursor.
+    Raises ValueError if the cursor is malformed.
+    '''
+    start_time, show_id = cursor.rsplit('_', 1)
+    return datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S.%f'), int(show_id)
+
+def shows_page(after=None, limit=SHOWS_PER_PAGE):
+    '''
+    One page of shows ordered by (start_time, id) and the cursor of the next
+    page, None on the last page. Pages are keyset paginated: `after` is the
+    cursor of the previous page, so every page is a range scan on the
+    (start_time, id) index whatever its position in the calendar.
+    '''
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Venue.id == Show.venue_id).\
+        join(Artist, Artist.id == Show.artist_id)
+
+    if after:
+        query = query.filter(tuple_(Show.start_time, Show.id) > tuple_(*decode_cursor(after)))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.order_by(Show.start_time, Show.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+
+    shows = [{
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time
+    } for row in rows]
+    return shows, next_cursor
+
+#----------------------------------------------------------------------------#
+# Streams.
+#
+# The API streams whole tables: rows are read from a server side cursor a
+# batch at a time and only the requested columns are selected.
+#----------------------------------------------------------------------------#
+
+STREAM_BATCH_SIZE = 1000
+
+ENTITY_FIELDS = (
+    'id', 'name', 'city', 'state', 'phone', 'genres', 'image_link', 'facebook_link',
+    'website', 'seeking_description', 'num_upcoming_shows', 'num_past_shows'
+)
+
+STREAM_COLUMNS = {
+    'venues': dict(
+        [(field, getattr(Venue, field)) for field in ENTITY_FIELDS + ('address', 'seeking_talent')]
+    ),
+    'artists': dict(
+        [(field, getattr(Artist, field)) for field in ENTITY_FIELDS + ('seeking_venue',)]
+    ),
+    'shows': {
+        'id': Show.id,
+        'start_time': Show.start_time,
+        'venue_id': Show.venue_id,
+        'venue_name': Venue.name,
+        'artist_id': Show.artist_id,
+        'artist_name': Artist.name,
+        'artist_image_link': Artist.image_link
+    }
+}
+
+def stream(kind, fields, criterion=None, batch_size=STREAM_BATCH_SIZE):
+    '''
+    Dicts of the `fields` of every venue, artist or show matching the
+    optional `criterion`, ordered by id for venues and artists and by start
+    time for shows.
+    '''
+    columns = STREAM_COLUMNS[kind]
+    query = db.session.query(*[columns[field].label(field) for field in fields])
+    if kind == 'venues':
+        query = query.select_from(Venue).order_by(Venue.id)
+    elif kind == 'artists':
+        query = query.select_from(Artist).order_by(Artist.id)
+    else:
+        query = query.select_from(Show).\
+            join(Venue, Venue.id == Show.venue_id).\
+            join(Artist, Artist.id == Show.artist_id).\
+            order_by(Show.start_time, Show.id)
+    if criterion is not None:
+        query = query.filter(criterion)
+    for row in query.execution_options(stream_results=True).yield_per(batch_size):
+        yield row._asdict()
+
+def shows_version(venue_id=None, artist_id=None):
+    '''
+    (version, update time) of the shows of a venue, of an artist or of
+    everyone, None if there is no such venue or artist. Every feed has the
+    version of the feed sequence, see counters, which changes with every
+    commit writing to the venues, artists or shows.
+    '''
+    if venue_id is not None and db.session.query(Venue.id).filter(Venue.id == venue_id).first() is None:
+        return None
+    if artist_id is not None and db.session.query(Artist.id).filter(Artist.id == artist_id).first() is None:
+        return None
+    row = db.session.query(FeedSequence.version, FeedSequence.update_time).filter(FeedSequence.id == 1).first()
+    # No change yet
+    return tuple(row) if row else (0, None)
@@ -0,0 +1,77 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy import SignallingSession, get_state
+from sqlalchemy import event
+
+#----------------------------------------------------------------------------#
+# Read replica.
+#
+# When REPLICA_DATABASE_URL is set, the views decorated with read_only
+# query the replica and everything else the primary. A client whose request
+# wrote to the database reads from the primary for REPLICA_STICKY_SECONDS
+# afterwards, bypassing the fragment cache, so the page it is redirected to
+# shows its own changes even if the replica lags behind.
+#----------------------------------------------------------------------------#
+
+BIND = 'replica'
+STICKY_KEY = 'primary_until'
+
+class RoutingSession(SignallingSession):
+    '''
+    Session sending the queries of read-only views to the replica engine.
+    Flushes always go to the primary.
+    '''
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_app_context() and g.get('use_replica'):
+            return get_state(self.app).db.get_engine(self.app, bind=BIND)
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def wrote(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def committed(db_session):
+    # Without a replica every read is from the primary, and a sticky session
+    # would only add a cookie to the response
+    wrote = db_session.info.pop('wrote', False)
+    if wrote and has_request_context() and replica_enabled(db_session.app):
+        session[STICKY_KEY] = time.time() + db_session.app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def rolled_back(db_session):
+    db_session.info.pop('wrote', None)
+
+def replica_enabled(app):
+    return BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+def read_only(view):
+    '''
+    Route the queries of `view` to the replica, unless the client wrote
+    recently.
+    '''
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        use_replica()
+        return view(*args, **kwargs)
+    return wrapper
+
+def use_replica():
+    enabled = replica_enabled(current_app)
+    g.reading_own_writes = enabled and session.get(STICKY_KEY, 0) >= time.time()
+    g.use_replica = enabled and not g.reading_own_writes
+
+def reading_own_writes():
+    '''
+    Whether the client of the request reads from the primary because it
+    wrote recently. Data cached by other requests may come from the replica
+    and miss its writes.
+    '''
+    return g.get('reading_own_writes', False)
@@ -0,0 +1,106 @@
+from bisect import bisect_right
+from datetime import timedelta
+
+from sqlalchemy import or_
+
+from models import db, Show
+import dates
+
+#----------------------------------------------------------------------------#
+# Show scheduling.
+#
+# Every show lasts SHOW_LENGTH, so two shows of the same venue or artist
+# overlap when their start times are less than SHOW_LENGTH apart. A single
+# booking is checked with one range probe on the (venue_id, start_time) and
+# (artist_id, start_time) indexes. On Postgres the exclusion constraints of
+# the Show table enforce the same rule against concurrent bookings.
+#----------------------------------------------------------------------------#
+
+# Keep in sync with the exclusion constraints of migration b7e3a91c5d42
+SHOW_LENGTH = timedelta(hours=2)
+
+def _show(row):
+    return {
+        'id': row.id,
+        'venue_id': row.venue_id,
+        'artist_id': row.artist_id,
+        'start_time': row.start_time
+    }
+
+def find_conflict(venue_id, artist_id, start_time):
+    '''
+    An existing show of the venue or of the artist overlapping a show
+    starting at `start_time`, None if the slot is free.
+    '''
+    row = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time).\
+        filter(or_(Show.venue_id == venue_id, Show.artist_id == artist_id)).\
+        filter(Show.start_time > start_time - SHOW_LENGTH).\
+        filter(Show.start_time < start_time + SHOW_LENGTH).\
+        first()
+    return _show(row) if row else None
+
+class Bookings(object):
+    '''
+    Start times of the shows of each venue or artist, kept sorted so a new
+    start time finds its neighbours with a binary search.
+    '''
+    def __init__(self):
+        self.starts = {}
+
+    def add(self, key, start_time, show):
+        starts, shows = self.starts.setdefault(key, ([], []))
+        i = bisect_right(starts, start_time)
+        starts.insert(i, start_time)
+        shows.insert(i, show)
+
+    def conflict(self, key, start_time):
+        if key not in self.starts:
+            return None
+        starts, shows = self.starts[key]
+        # First show starting after start_time - SHOW_LENGTH
+        i = bisect_right(starts, start_time - SHOW_LENGTH)
+        if i < len(starts) and starts[i] < start_time + SHOW_LENGTH:
+            return shows[i]
+        return None
+
+def check_schedule(proposals):
+    '''
+    Conflicts of a list of proposed shows, with the existing shows and with
+    each other, as {'index', 'error'} dicts plus the conflicting 'show' when
+    there is one. The existing shows that may conflict are loaded with a
+    single statement.
+    '''
+    conflicts = []
+    shows = []
+    for index, proposal in enumerate(proposals):
+        try:
+            shows.append((index, int(proposal['venue_id']), int(proposal['artist_id']), dates.to_naive_utc(proposal['start_time'])))
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            conflicts.append({'index': index, 'error': 'invalid show: %s' % e})
+    if not shows:
+        return conflicts
+
+    venues = Bookings()
+    artists = Bookings()
+    rows = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time).\
+        filter(or_(
+            Show.venue_id.in_(set(show[1] for show in shows)),
+            Show.artist_id.in_(set(show[2] for show in shows))
+        )).\
+        filter(Show.start_time > min(show[3] for show in shows) - SHOW_LENGTH).\
+        filter(Show.start_time < max(show[3] for show in shows) + SHOW_LENGTH)
+    for row in rows:
+        show = _show(row)
+        venues.add(row.venue_id, row.start_time, show)
+        artists.add(row.artist_id, row.start_time, show)
+
+    for index, venue_id, artist_id, start_time in shows:
+        conflict = venues.conflict(venue_id, start_time) or artists.conflict(artist_id, start_time)
+        if conflict:
+            conflicts.append({'index': index, 'error': 'overlaps another show', 'show': conflict})
+            continue
+        # Accepted proposals are booked too, so later ones can't overlap them
+        show = {'id': None, 'index': index, 'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time}
+        venues.add(venue_id, start_time, show)
+        artists.add(artist_id, start_time, show)
+    return sorted(conflicts, key=lambda conflict: conflict['index'])
@@ -0,0 +1,40 @@
+from sqlalchemy import and_, case, func, true
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Search.
+#
+# Name search is a case-insensitive match of every word of the term. On
+# Postgres the ILIKE patterns are answered by the pg_trgm GIN indexes on the
+# name columns, so leading wildcards no longer force a sequential scan, and
+# matches are ranked by trigram similarity. Other databases (SQLite in the
+# tests) fall back to plain LIKE and alphabetical ranking.
+#----------------------------------------------------------------------------#
+
+def is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def match(column, term):
+    '''
+    Criterion matching the rows of `column` that contain every word of `term`.
+    An empty term matches everything.
+    '''
+    words = term.split()
+    if not words:
+        return true()
+    return and_(*[column.ilike('%' + escape_like(word) + '%', escape='\\') for word in words])
+
+def rank(column, term):
+    '''
+    ORDER BY clauses for the matches of `term`: names starting with the term
+    first, then the most similar names, then alphabetical order.
+    '''
+    term = term.strip()
+    prefix = case([(column.ilike(escape_like(term) + '%', escape='\\'), 0)], else_=1)
+    if is_postgres():
+        return [prefix, func.similarity(column, term).desc(), column]
+    return [prefix, column]
@@ -0,0 +1,195 @@
+import random
+from datetime import datetime, timedelta
+
+import click
+
+from models import db, Venue, Artist, Show
+from forms import GENRES
+from importer import fyyur_cli, reset_sequence, CHUNK_SIZE
+from cache import cache
+import counters
+
+#----------------------------------------------------------------------------#
+# Seed data.
+#
+# Loading the fixtures is idempotent: rows are upserted by id, so running
+# the command again leaves the database unchanged. The app itself never
+# writes to the database when it starts.
+#----------------------------------------------------------------------------#
+
+VENUES = [{
+    "id": 1,
+    "name": "The Musical Hop",
+    "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
+    "address": "1015 Folsom Street",
+    "city": "San Francisco",
+    "state": "CA",
+    "phone": "123-123-1234",
+    "website": "https://www.themusicalhop.com",
+    "facebook_link": "https://www.facebook.com/TheMusicalHop",
+    "seeking_talent": True,
+    "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
+    "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
+}, {
+    "id": 2,
+    "name": "The Dueling Pianos Bar",
+    "genres": ["Classical", "R&B", "Hip-Hop"],
+    "address": "335 Delancey Street",
+    "city": "New York",
+    "state": "NY",
+    "phone": "914-003-1132",
+    "website": "https://www.theduelingpianos.com",
+    "facebook_link": "https://www.facebook.com/theduelingpianos",
+    "seeking_talent": False,
+    "image_link": "https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80",
+}, {
+    "id": 3,
+    "name": "Park Square Live Music & Coffee",
+    "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
+    "address": "34 Whiskey Moore Ave",
+    "city": "San Francisco",
+    "state": "CA",
+    "phone": "415-000-1234",
+    "website": "https://www.parksquarelivemusicandcoffee.com",
+    "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
+    "seeking_talent": False,
+    "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
+}]
+
+ARTISTS = [{
+    "id": 4,
+    "name": "Guns N Petals",
+    "genres": ["Rock n Roll"],
+    "city": "San Francisco",
+    "state": "CA",
+    "phone": "326-123-5000",
+    "website": "https://www.gunsnpetalsband.com",
+    "facebook_link": "https://www.facebook.com/GunsNPetals",
+    "seeking_venue": True,
+    "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
+    "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
+}, {
+    "id": 5,
+    "name": "Matt Quevedo",
+    "genres": ["Jazz"],
+    "city": "New York",
+    "state": "NY",
+    "phone": "300-400-5000",
+    "facebook_link": "https://www.facebook.com/mattquevedo923251523",
+    "seeking_venue": False,
+    "image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
+}, {
+    "id": 6,
+    "name": "The Wild Sax Band",
+    "genres": ["Jazz", "Classical"],
+    "city": "San Francisco",
+    "state": "CA",
+    "phone": "432-325-5432",
+    "seeking_venue": False,
+    "image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
+}]
+
+SHOWS = [{
+    "id": 1,
+    "venue_id": 1,
+    "artist_id": 4,
+    "start_time": datetime(2019, 5, 21, 21, 30),
+}, {
+    "id": 2,
+    "venue_id": 3,
+    "artist_id": 5,
+    "start_time": datetime(2019, 6, 15, 23, 0),
+}, {
+    "id": 3,
+    "venue_id": 3,
+    "artist_id": 6,
+    "start_time": datetime(2035, 4, 1, 20, 0),
+}, {
+    "id": 4,
+    "venue_id": 3,
+    "artist_id": 6,
+    "start_time": datetime(2035, 4, 8, 20, 0),
+}, {
+    "id": 5,
+    "venue_id": 3,
+    "artist_id": 6,
+    "start_time": datetime(2035, 4, 15, 20, 0),
+}]
+
+CITIES = [
+    ('San Francisco', 'CA'),
+    ('New York', 'NY'),
+    ('Austin', 'TX'),
+    ('Chicago', 'IL'),
+    ('Seattle', 'WA'),
+    ('New Orleans', 'LA'),
+]
+
+def load_fixtures():
+    '''
+    Upsert the sample venues, artists and shows.
+    '''
+    for model, fixtures in [(Venue, VENUES), (Artist, ARTISTS), (Show, SHOWS)]:
+        for data in fixtures:
+            db.session.merge(model(**data))
+        db.session.commit()
+        reset_sequence(model.__table__)
+    cache.invalidate('index', 'venues', 'artists', 'shows', 'venue_choices', 'artist_choices')
+
+def insert_chunked(table, rows, chunk_size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            db.session.execute(table.insert(), chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+
+def generate(count, shows_per_venue=10, seed=0):
+    '''
+    Insert `count` synthetic venues and artists with `shows_per_venue` shows
+    each, at most 365, spread over a year around today, for load testing.
+    '''
+    rng = random.Random(seed)
+    first_venue = (db.session.query(db.func.max(Venue.id)).scalar() or 0) + 1
+    first_artist = (db.session.query(db.func.max(Artist.id)).scalar() or 0) + 1
+
+    def entity(kind, i):
+        city, state = rng.choice(CITIES)
+        return {
+            'name': 'Synthetic %s %d' % (kind, i),
+            'city': city,
+            'state': state,
+            'genres': rng.sample(GENRES, 2),
+            'phone': '555-%03d-%04d' % (i // 10000 % 1000, i % 10000)
+        }
+
+    insert_chunked(Venue.__table__, (dict(entity('Venue', i), id=first_venue + i, address='%d Main Street' % i, seeking_talent=False) for i in range(count)))
+    insert_chunked(Artist.__table__, (dict(entity('Artist', i), id=first_artist + i, seeking_venue=False) for i in range(count)))
+    # The j-th show of every venue is on the j-th show day of the year and
+    # each artist plays at most once a day, so no two bookings overlap
+    first_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=182)
+    insert_chunked(Show.__table__, ({
+        'venue_id': first_venue + i // shows_per_venue,
+        'artist_id': first_artist + (i // shows_per_venue + i % shows_per_venue) % count,
+        'start_time': first_day + timedelta(days=(i % shows_per_venue) * 365 // shows_per_venue, hours=rng.randrange(12, 23))
+    } for i in range(count * shows_per_venue)))
+
+    reset_sequence(Venue.__table__)
+    reset_sequence(Artist.__table__)
+    counters.recount()
+    cache.invalidate('index', 'venues', 'artists', 'shows', 'venue_choices', 'artist_choices')
+
+@fyyur_cli.command('seed')
+@click.option('--generate', 'count', type=int, default=0, help='Also insert this many synthetic venues and artists.')
+@click.option('--shows-per-venue', type=click.IntRange(1, 365), default=10, show_default=True, help='Shows of each synthetic venue.')
+def seed_command(count, shows_per_venue):
+    '''Load the sample data, and optionally synthetic data for load testing.'''
+    load_fixtures()
+    click.echo('Loaded %d venues, %d artists and %d shows.' % (len(VENUES), len(ARTISTS), len(SHOWS)))
+    if count:
+        generate(count, shows_per_venue)
+        click.echo('Generated %d venues, %d artists and %d shows.' % (count, count, count * shows_per_venue))
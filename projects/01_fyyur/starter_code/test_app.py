@@ -0,0 +1,949 @@
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+from flask import Flask, g, session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import TimeoutError
+
+from models import app, db, Venue, Artist, Show, ShowCounters
+from forms import lookup_genre, ShowForm
+from werkzeug.datastructures import MultiDict
+
+from cache import cache, Cache, MemoryBackend
+from importer import import_file
+from seed import load_fixtures, generate, VENUES, ARTISTS
+from writes import WriteBehind
+import schedule
+from api import api, stream_list
+from feeds import feeds, ics_line
+import pool
+import replica
+from flask_query_profiler import QueryBudgetExceeded
+import counters
+import dates
+import queries
+
+import app as fyyur  # registers the routes and blueprints of app.py
+
+
+class FyyurTestCase(unittest.TestCase):
+  """This class represents the fyyur test case"""
+
+  def setUp(self):
+    """Define test variables and initialize a throwaway database."""
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['WTF_CSRF_ENABLED'] = False
+    self.app = app
+    self.ctx = self.app.app_context()
+    self.ctx.push()
+    db.create_all()
+    cache.clear()
+
+    self.now = datetime(2020, 5, 1, 12, 0, 0)
+    # Shows before now are counted as past
+    db.session.add(ShowCounters(id=1, swept_at=self.now))
+    db.session.commit()
+
+  def tearDown(self):
+    """Executed after each test"""
+    db.session.remove()
+    db.drop_all()
+    self.ctx.pop()
+
+  @contextmanager
+  def count_queries(self, with_parameters=False):
+    """Collect every SQL statement sent to the database inside the block."""
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+      statements.append((statement, parameters) if with_parameters else statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+      yield statements
+    finally:
+      event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+  def seed(self, num_venues, shows_per_venue=2):
+    """Insert `num_venues` venues spread over a few cities, each with past and upcoming shows."""
+    cities = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX')]
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA')
+    db.session.add(artist)
+    venues = []
+    for i in range(num_venues):
+      city, state = cities[i % len(cities)]
+      venue = Venue(name='Venue %d' % i, city=city, state=state)
+      venues.append(venue)
+      db.session.add(venue)
+    db.session.flush()
+    for venue in venues:
+      for j in range(shows_per_venue):
+        db.session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=self.now + timedelta(days=j)))
+      db.session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=self.now - timedelta(days=1)))
+    db.session.commit()
+    return venues
+
+  def seed_large(self, num_venues=2000, num_artists=2000, num_shows=20000):
+    """Bulk insert a large dataset and refresh the planner statistics."""
+    db.session.execute(Venue.__table__.insert(), [{
+      'name': 'Venue %d' % i,
+      'city': 'City %d' % (i % 50),
+      'state': 'S%d' % (i % 10),
+      'seeking_talent': False,
+      'create_time': self.now - timedelta(minutes=i)
+    } for i in range(num_venues)])
+    db.session.execute(Artist.__table__.insert(), [{
+      'name': 'Artist %d' % i,
+      'seeking_venue': False,
+      'create_time': self.now - timedelta(minutes=i)
+    } for i in range(num_artists)])
+    db.session.execute(Show.__table__.insert(), [{
+      'venue_id': i % num_venues + 1,
+      'artist_id': (i * 7) % num_artists + 1,
+      'start_time': self.now + timedelta(hours=i - num_shows // 2)
+    } for i in range(num_shows)])
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+  def sequential_scans(self, statement, parameters):
+    """Tables read by a full table scan, without any index, in the SQLite plan of a statement."""
+    cursor = db.session.connection().connection.cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+    plan = [row[-1] for row in cursor.fetchall()]
+    return [detail for detail in plan if re.match(r'^SCAN \S+$', detail)]
+
+  def test_venue_areas(self):
+    self.seed(6)
+    areas = queries.venue_areas()
+
+    self.assertEqual([(area['city'], area['state']) for area in areas],
+      [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX')])
+    for area in areas:
+      self.assertEqual(len(area['venues']), 2)
+      for venue in area['venues']:
+        self.assertEqual(venue['num_upcoming_shows'], 2)
+
+  def test_venue_areas_without_shows(self):
+    db.session.add(Venue(name='The Dueling Pianos Bar', city='New York', state='NY'))
+    db.session.commit()
+    areas = queries.venue_areas()
+
+    self.assertEqual(areas[0]['venues'][0]['num_upcoming_shows'], 0)
+
+  def test_venue_areas_query_count_is_constant(self):
+    # Benchmark: the number of statements must not grow with the venues
+    self.seed(10)
+    with self.count_queries() as small:
+      queries.venue_areas()
+    self.seed(300)
+    with self.count_queries() as large:
+      areas = queries.venue_areas()
+
+    self.assertEqual(sum(len(area['venues']) for area in areas), 310)
+    self.assertEqual(len(small), 1)
+    self.assertEqual(len(large), len(small))
+
+  def test_search_venues(self):
+    self.seed(5)
+    with self.count_queries() as statements:
+      results = queries.search_venues('venue 1')
+
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(results['count'], 1)
+    self.assertEqual(results['data'][0]['name'], 'Venue 1')
+    self.assertEqual(results['data'][0]['num_upcoming_shows'], 2)
+
+  def test_search_venues_broad_term(self):
+    self.seed(50)
+    with self.count_queries() as statements:
+      results = queries.search_venues('v')
+
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(results['count'], 50)
+    self.assertEqual(len(results['data']), 50)
+
+  def test_search_venues_term_not_found(self):
+    self.seed(5)
+    results = queries.search_venues('zxcvbnm')
+
+    self.assertEqual(results['count'], 0)
+    self.assertEqual(results['data'], [])
+
+  def test_search_venues_ranking(self):
+    for name in ['Park Square Live Music & Coffee', 'The Musical Hop', 'Music Box', '100% Jazz']:
+      db.session.add(Venue(name=name, city='San Francisco', state='CA'))
+    db.session.commit()
+
+    results = queries.search_venues('music')
+    self.assertEqual([venue['name'] for venue in results['data']],
+      ['Music Box', 'Park Square Live Music & Coffee', 'The Musical Hop'])
+
+    results = queries.search_venues('hop musical')
+    self.assertEqual([venue['name'] for venue in results['data']], ['The Musical Hop'])
+
+    results = queries.search_venues('0%')
+    self.assertEqual([venue['name'] for venue in results['data']], ['100% Jazz'])
+
+  def test_search_artists(self):
+    self.seed(4)
+    with self.count_queries() as statements:
+      results = queries.search_artists('petals')
+
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(results['count'], 1)
+    self.assertEqual(results['data'][0]['num_upcoming_shows'], 8)
+
+  def test_venue_detail(self):
+    venue_id = self.seed(1, shows_per_venue=3)[0].id
+    with self.count_queries() as statements:
+      data = queries.venue_detail(venue_id, self.now)
+
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(data['name'], 'Venue 0')
+    self.assertEqual(data['past_shows_count'], 1)
+    self.assertEqual(data['upcoming_shows_count'], 3)
+    self.assertEqual(data['upcoming_shows'][0]['artist_name'], 'Guns N Petals')
+
+  def test_venue_detail_without_shows(self):
+    venue = Venue(name='The Dueling Pianos Bar', city='New York', state='NY', genres=['Classical', 'R&B'])
+    db.session.add(venue)
+    db.session.commit()
+    data = queries.venue_detail(venue.id, self.now)
+
+    self.assertEqual(data['genres'], ['Classical', 'R&B'])
+    self.assertEqual(data['past_shows'], [])
+    self.assertEqual(data['upcoming_shows'], [])
+
+  def test_venue_detail_not_found(self):
+    self.assertIsNone(queries.venue_detail(1000, self.now))
+
+  def test_artist_detail(self):
+    self.seed(3, shows_per_venue=2)
+    artist = Artist.query.first()
+    with self.count_queries() as statements:
+      data = queries.artist_detail(artist.id, self.now)
+
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(data['past_shows_count'], 3)
+    self.assertEqual(data['upcoming_shows_count'], 6)
+    self.assertEqual(data['past_shows'][0]['venue_name'][:5], 'Venue')
+
+  def test_artist_detail_not_found(self):
+    self.assertIsNone(queries.artist_detail(1000, self.now))
+
+  def test_detail_query_count_is_constant(self):
+    venue = self.seed(1, shows_per_venue=100)[0]
+    artist = Artist.query.first()
+    for loader, id in [(queries.venue_detail, venue.id), (queries.artist_detail, artist.id)]:
+      with self.count_queries() as statements:
+        data = loader(id, self.now)
+      self.assertEqual(data['upcoming_shows_count'], 100)
+      self.assertEqual(len(statements), 1)
+
+  def test_lookup_genre(self):
+    self.assertEqual(lookup_genre('jazz'), 'Jazz')
+    self.assertEqual(lookup_genre('rock-n-roll'), 'Rock n Roll')
+    self.assertEqual(lookup_genre('R&B'), 'R&B')
+    self.assertIsNone(lookup_genre('Polka'))
+
+  def test_venues_by_genre(self):
+    db.session.add(Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz', 'Reggae', 'Folk']))
+    db.session.add(Venue(name='The Dueling Pianos Bar', city='New York', state='NY', genres=['Classical', 'R&B', 'Hip-Hop']))
+    db.session.add(Venue(name='Park Square Live Music & Coffee', city='San Francisco', state='CA', genres=['Rock n Roll', 'Jazz']))
+    db.session.commit()
+    with self.count_queries() as statements:
+      results = queries.venues_by_genre('Jazz')
+
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(results['count'], 2)
+    self.assertEqual([venue['name'] for venue in results['data']],
+      ['Park Square Live Music & Coffee', 'The Musical Hop'])
+    self.assertEqual(queries.venues_by_genre('Rock n Roll')['count'], 1)
+    self.assertEqual(queries.venues_by_genre('Soul')['count'], 0)
+
+  def test_artists_by_genre(self):
+    db.session.add(Artist(name='Matt Quevedo', city='New York', state='NY', genres=['Jazz']))
+    db.session.add(Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock n Roll']))
+    db.session.commit()
+    results = queries.artists_by_genre('Rock n Roll')
+
+    self.assertEqual(results['count'], 1)
+    self.assertEqual(results['data'][0]['name'], 'Guns N Petals')
+
+  def test_shows_page(self):
+    self.seed(5, shows_per_venue=3)
+    shows, next_cursor = queries.shows_page(limit=100)
+
+    self.assertEqual(len(shows), 20)
+    self.assertIsNone(next_cursor)
+    self.assertEqual(shows, sorted(shows, key=lambda show: show['start_time']))
+
+  def test_shows_page_cursor_walks_every_show_once(self):
+    # Many shows share the same start_time, the id breaks the ties
+    self.seed(10, shows_per_venue=3)
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+      with self.count_queries() as statements:
+        shows, cursor = queries.shows_page(cursor, limit=7)
+      self.assertEqual(len(statements), 1)
+      seen.extend(shows)
+      pages += 1
+      if cursor is None:
+        break
+
+    self.assertEqual(len(seen), 40)
+    self.assertEqual(pages, 6)
+    self.assertEqual(seen, sorted(seen, key=lambda show: show['start_time']))
+
+  def test_shows_page_invalid_cursor(self):
+    with self.assertRaises(ValueError):
+      queries.shows_page('not-a-cursor')
+
+  def test_core_views_do_not_scan_tables(self):
+    # Regression test: every statement behind the home, venues, detail and
+    # shows pages must be answered through an index on a large dataset
+    self.seed_large()
+    with self.count_queries(with_parameters=True) as statements:
+      queries.latest(Venue)
+      queries.latest(Artist)
+      queries.venue_areas()
+      queries.venue_detail(5, self.now)
+      queries.artist_detail(5, self.now)
+      shows, next_cursor = queries.shows_page()
+      queries.shows_page(next_cursor)
+
+    self.assertEqual(len(statements), 7)
+    for statement, parameters in statements:
+      self.assertEqual(self.sequential_scans(statement, parameters), [], statement)
+
+  def test_cache_hits_and_invalidation(self):
+    cache = Cache(self.app)
+    self.seed(3)
+    with self.count_queries() as statements:
+      first = cache.get_or_set('venues', queries.venue_areas)
+      second = cache.get_or_set('venues', queries.venue_areas)
+
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(first, second)
+    self.assertEqual(cache.stats()['routes']['venues'], {'hits': 1, 'misses': 1})
+
+    db.session.add(Venue(name='The Dueling Pianos Bar', city='New York', state='NY'))
+    db.session.commit()
+    cache.invalidate('venues')
+    areas = cache.get_or_set('venues', queries.venue_areas)
+
+    self.assertEqual(sum(len(area['venues']) for area in areas), 4)
+    self.assertEqual(cache.stats()['misses'], 2)
+
+  def test_cache_keys_include_arguments(self):
+    cache = Cache()
+    self.assertEqual(cache.get_or_set('shows', lambda after: [after], 'a'), ['a'])
+    self.assertEqual(cache.get_or_set('shows', lambda after: [after], 'b'), ['b'])
+    self.assertEqual(cache.stats()['hits'], 0)
+
+  def test_memory_backend_expiry_and_eviction(self):
+    backend = MemoryBackend(max_entries=2)
+    backend.set('a', 1, 60)
+    backend.set('b', 2, 60)
+    backend.get('a')
+    backend.set('c', 3, 60)
+
+    self.assertEqual(backend.get('a'), 1)
+    self.assertIsNone(backend.get('b'))
+    self.assertEqual(backend.get('c'), 3)
+
+    backend.set('expired', 4, -1)
+    self.assertIsNone(backend.get('expired'))
+
+  def tmpdir(self):
+    directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, directory)
+    return directory
+
+  def write_file(self, name, content):
+    path = os.path.join(self.tmpdir(), name)
+    with open(path, 'w') as f:
+      f.write(content)
+    return path
+
+  def test_import_venues_csv(self):
+    path = self.write_file('venues.csv',
+      'name,city,state,address,phone,genres,seeking_talent\n'
+      'The Musical Hop,San Francisco,CA,1015 Folsom Street,123-123-1234,"Jazz,Reggae",true\n'
+      'Nowhere,San Francisco,XX,1 Street,,Jazz,false\n'
+      'The Dueling Pianos Bar,New York,NY,335 Delancey Street,914-003-1132,Classical,false\n')
+    rejected_rows = []
+    imported, rejected = import_file('venues', path, report=rejected_rows.append)
+
+    self.assertEqual((imported, rejected), (2, 1))
+    self.assertTrue(rejected_rows[0].startswith('Row 2 rejected'))
+    venue = Venue.query.filter_by(name='The Musical Hop').one()
+    self.assertEqual(venue.genres, ['Jazz', 'Reggae'])
+    self.assertEqual(venue.seeking_talent, True)
+
+  def test_import_shows_jsonl_in_chunks(self):
+    self.seed(2, shows_per_venue=0)
+    venue_id, artist_id = Venue.query.first().id, Artist.query.first().id
+    start = datetime(2035, 4, 1)
+    rows = [{'venue_id': venue_id, 'artist_id': artist_id, 'start_time': str(start + timedelta(hours=3 * i))} for i in range(25)]
+    rows.append({'venue_id': 1000, 'artist_id': artist_id, 'start_time': '2035-04-01 20:00:00'})
+    rows.append({'venue_id': venue_id, 'artist_id': artist_id, 'start_time': 'tomorrow'})
+    # Overlaps the first show, imported in an earlier chunk
+    rows.append({'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2035-04-01 01:00:00'})
+    path = self.write_file('shows.jsonl', '\n'.join(json.dumps(row) for row in rows))
+    rejected_rows = []
+    with self.count_queries() as statements:
+      imported, rejected = import_file('shows', path, chunk_size=10, report=rejected_rows.append)
+
+    self.assertEqual((imported, rejected), (25, 3))
+    self.assertEqual(rejected_rows[-1], 'Row 28 rejected: overlaps another show')
+    self.assertEqual(Show.query.filter(Show.start_time >= self.now).count(), 25)
+    # Two id lookups then one insert per chunk
+    self.assertEqual(len([s for s in statements if s.startswith('INSERT')]), 3)
+
+  def test_import_artists_with_ids(self):
+    path = self.write_file('artists.jsonl',
+      json.dumps({'id': 4, 'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA', 'genres': ['Rock n Roll'], 'seeking_venue': True}) + '\n' +
+      json.dumps({'name': 'Matt Quevedo', 'city': 'New York', 'state': 'NY', 'genres': ['Jazz'], 'seeking_venue': False}) + '\n')
+    imported, rejected = import_file('artists', path)
+
+    self.assertEqual((imported, rejected), (2, 0))
+    self.assertEqual(Artist.query.get(4).name, 'Guns N Petals')
+    self.assertEqual(Artist.query.get(4).seeking_venue, True)
+    self.assertEqual(Artist.query.filter_by(name='Matt Quevedo').one().seeking_venue, False)
+
+  def test_load_fixtures_is_idempotent(self):
+    load_fixtures()
+    load_fixtures()
+
+    self.assertEqual((Venue.query.count(), Artist.query.count(), Show.query.count()), (3, 3, 5))
+    self.assertEqual(Artist.query.get(4).name, 'Guns N Petals')
+    self.assertEqual(Venue.query.get(1).genres, ['Jazz', 'Reggae', 'Swing', 'Classical', 'Folk'])
+
+  def test_seeded_genres_are_genres(self):
+    # Their tags link to the genre pages, which only know the form genres
+    for item in VENUES + ARTISTS:
+      for genre in item['genres']:
+        self.assertEqual(lookup_genre(genre), genre)
+    load_fixtures()
+    self.assertEqual(app.test_client().get('/venues/genres/Swing').status_code, 200)
+
+  def test_generate(self):
+    load_fixtures()
+    with self.count_queries() as statements:
+      generate(50, shows_per_venue=4)
+
+    self.assertEqual((Venue.query.count(), Artist.query.count(), Show.query.count()), (53, 53, 205))
+    self.assertEqual(len([s for s in statements if s.startswith('INSERT')]), 3)
+    self.assertEqual(Venue.query.get(4).name, 'Synthetic Venue 0')
+
+  def test_format_datetime_matches_babel(self):
+    for format, pattern in dates.PATTERNS.items():
+      expected = babel.dates.format_datetime(dateutil.parser.parse('2035-04-01 20:00:00'), pattern)
+      self.assertEqual(dates.format_datetime('2035-04-01 20:00:00', format), expected)
+      self.assertEqual(dates.format_datetime(datetime(2035, 4, 1, 20), format), expected)
+    self.assertEqual(dates.format_datetime(datetime(2035, 4, 1, 20), 'yyyy-MM-dd HH:mm'), '2035-04-01 20:00')
+
+  def test_format_datetimes(self):
+    values = [self.now + timedelta(hours=i) for i in range(3)]
+    self.assertEqual(dates.format_datetimes(values, 'full'), [dates.format_datetime(value, 'full') for value in values])
+
+  def test_show_form_choices_are_cached(self):
+    self.seed(3)
+    with app.test_request_context():
+      with self.count_queries() as statements:
+        form = ShowForm(meta={'csrf': False})
+      self.assertEqual(len(statements), 2)
+      self.assertEqual(form.venue_id.choices, sorted(form.venue_id.choices, key=lambda choice: choice[1]))
+      self.assertEqual(len(form.venue_id.choices), 3)
+      self.assertFalse(form.artist_id.autocomplete)
+
+      with self.count_queries() as statements:
+        ShowForm(meta={'csrf': False})
+      self.assertEqual(statements, [])
+
+      db.session.add(Artist(name='Matt Quevedo', city='New York', state='NY'))
+      db.session.commit()
+      cache.invalidate('artist_choices')
+      self.assertEqual(len(ShowForm(meta={'csrf': False}).artist_id.choices), 2)
+
+  def test_show_form_autocompletes_large_catalogues(self):
+    venue = self.seed(1)[0]
+    db.session.execute(Artist.__table__.insert(), [{'name': 'Artist %d' % i, 'seeking_venue': False} for i in range(queries.CHOICES_LIMIT)])
+    db.session.commit()
+    artist_id = Artist.query.filter_by(name='Artist 7').one().id
+    with app.test_request_context():
+      formdata = MultiDict({'artist_id': str(artist_id), 'venue_id': str(venue.id), 'start_time': '2035-04-01 20:00:00'})
+      form = ShowForm(formdata, meta={'csrf': False})
+      self.assertTrue(form.artist_id.autocomplete)
+      self.assertFalse(form.venue_id.autocomplete)
+      self.assertEqual(form.artist_id.choices, [(artist_id, 'Artist 7')])
+      self.assertTrue(form.validate())
+
+      formdata['artist_id'] = '100000'
+      self.assertFalse(ShowForm(formdata, meta={'csrf': False}).validate())
+
+  def test_autocomplete(self):
+    self.seed(12)
+    self.assertEqual([venue['name'] for venue in queries.autocomplete(Venue, 'venue 1')], ['Venue 1', 'Venue 10', 'Venue 11'])
+    self.assertEqual(len(queries.autocomplete(Venue, 'venue', limit=5)), 5)
+
+  def write_behind(self):
+    """A write-behind queue in a temporary file, applying two writes per batch."""
+    config = Flask(__name__)
+    config.config.update(WRITE_BEHIND=True, WRITE_QUEUE_PATH=os.path.join(self.tmpdir(), 'queue.sqlite3'), WRITE_BATCH_SIZE=2)
+    write_behind = WriteBehind(config)
+    write_behind.register('venue', Venue, ('venues',))
+    write_behind.register('show', Show, ('shows',))
+    return write_behind
+
+  def test_write_behind(self):
+    venue_id = self.seed(1)[0].id
+    artist_id = Artist.query.one().id
+    write_behind = self.write_behind()
+    created = write_behind.enqueue('venue', {'name': 'The Dueling Pianos Bar', 'city': 'New York', 'state': 'NY', 'genres': ['Jazz']})
+    updated = write_behind.enqueue('venue', {'name': 'Park Square Live Music & Coffee'}, venue_id)
+    show = write_behind.enqueue('show', {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2035-04-01 20:00:00'})
+    # Stored in UTC, as /shows/create does
+    zoned_show = write_behind.enqueue('show', {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2035-04-02T22:00:00+02:00'})
+    self.assertEqual(write_behind.status(created)['status'], 'pending')
+    self.assertEqual(Venue.query.count(), 1)
+
+    commits = []
+    def commit(conn):
+      commits.append(conn)
+    event.listen(db.engine, 'commit', commit)
+    try:
+      self.assertEqual(write_behind.drain(), 4)
+    finally:
+      event.remove(db.engine, 'commit', commit)
+    self.assertEqual(len(commits), 2)
+
+    self.assertEqual([write_behind.status(id)['status'] for id in (created, updated, show, zoned_show)], ['done'] * 4)
+    self.assertEqual(Venue.query.filter_by(name='The Dueling Pianos Bar').one().genres, ['Jazz'])
+    self.assertEqual(Venue.query.get(venue_id).name, 'Park Square Live Music & Coffee')
+    self.assertEqual(Show.query.filter_by(start_time=datetime(2035, 4, 1, 20)).count(), 1)
+    self.assertEqual(Show.query.filter_by(start_time=datetime(2035, 4, 2, 20)).count(), 1)
+
+  def test_write_behind_failures_do_not_fail_the_batch(self):
+    write_behind = self.write_behind()
+    missing = write_behind.enqueue('venue', {'name': 'Nowhere'}, 1000)
+    created = write_behind.enqueue('venue', {'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA'})
+    write_behind.drain()
+
+    status = write_behind.status(missing)
+    self.assertEqual(status['status'], 'failed')
+    self.assertIn('not found', status['error'])
+    self.assertEqual(write_behind.status(created)['status'], 'done')
+    self.assertEqual(Venue.query.count(), 1)
+    self.assertIsNone(write_behind.status(1000))
+
+  def test_find_conflict(self):
+    venues = self.seed(2, shows_per_venue=1)
+    venue_id, other_venue_id = venues[0].id, venues[1].id
+    db.session.add(Artist(name='Matt Quevedo'))
+    db.session.commit()
+    other_artist_id = Artist.query.filter_by(name='Matt Quevedo').one().id
+    artist_id = Artist.query.filter_by(name='Guns N Petals').one().id
+
+    conflict = schedule.find_conflict(venue_id, other_artist_id, self.now + timedelta(hours=1))
+    self.assertEqual((conflict['venue_id'], conflict['start_time']), (venue_id, self.now))
+    self.assertIsNotNone(schedule.find_conflict(other_venue_id, artist_id, self.now - timedelta(minutes=90)))
+    self.assertIsNone(schedule.find_conflict(venue_id, other_artist_id, self.now + schedule.SHOW_LENGTH))
+    self.assertIsNone(schedule.find_conflict(venue_id, other_artist_id, self.now + timedelta(hours=12)))
+
+  def test_check_schedule(self):
+    venue_id = self.seed(1, shows_per_venue=1)[0].id
+    artist_id = Artist.query.one().id
+    proposals = [
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-05-01 13:00:00'},
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-05-01 18:00:00'},
+      {'venue_id': 1000, 'artist_id': artist_id, 'start_time': '2020-05-01 19:30:00'},
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': 'someday'},
+      {'venue_id': venue_id, 'artist_id': 1000, 'start_time': '2020-05-01 20:00:00'},
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-05-01T13:00:00+02:00'},
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-05-02T00:00:00Z'}
+    ]
+    conflicts = schedule.check_schedule(proposals)
+
+    # Start times with a zone are compared in UTC
+    self.assertEqual([conflict['index'] for conflict in conflicts], [0, 2, 3, 5])
+    self.assertEqual(conflicts[0]['show']['start_time'], self.now)
+    self.assertEqual(conflicts[1]['show']['index'], 1)
+    self.assertIn('invalid', conflicts[2]['error'])
+
+  def test_check_schedule_in_one_query(self):
+    venue_ids = [venue.id for venue in self.seed(20, shows_per_venue=0)]
+    artist_id = Artist.query.one().id
+    proposals = [{
+      'venue_id': venue_ids[i % 20],
+      'artist_id': artist_id,
+      'start_time': self.now + timedelta(hours=3 * i)
+    } for i in range(2000)]
+    with self.count_queries() as statements:
+      conflicts = schedule.check_schedule(proposals)
+    self.assertEqual(len(statements), 1)
+    # The seeded shows, a day earlier, do not overlap the proposals
+    self.assertEqual(conflicts, [])
+
+  def counts(self, model, id):
+    row = db.session.query(model.num_upcoming_shows, model.num_past_shows).filter(model.id == id).one()
+    return tuple(row)
+
+  def test_show_counters(self):
+    venue_id = self.seed(2)[0].id
+    artist_id = Artist.query.one().id
+    self.assertEqual(self.counts(Venue, venue_id), (2, 1))
+    self.assertEqual(self.counts(Artist, artist_id), (4, 2))
+
+    show = Show(venue_id=venue_id, artist_id=artist_id, start_time=datetime(2020, 4, 1, 20))
+    db.session.add(show)
+    db.session.commit()
+    self.assertEqual(self.counts(Venue, venue_id), (2, 2))
+    db.session.delete(show)
+    db.session.commit()
+    self.assertEqual(self.counts(Venue, venue_id), (2, 1))
+
+  def test_sweep(self):
+    venue_ids = [venue.id for venue in self.seed(3)]
+    artist_id = Artist.query.one().id
+    db.session.add(Venue(name='Quiet venue'))
+    db.session.commit()
+
+    with self.count_queries() as statements:
+      self.assertEqual(counters.sweep(self.now + timedelta(hours=12)), 3)
+    self.assertEqual(len(statements), 5)
+    self.assertEqual([self.counts(Venue, id) for id in venue_ids], [(1, 2)] * 3)
+    self.assertEqual(self.counts(Artist, artist_id), (3, 6))
+    self.assertEqual(ShowCounters.query.one().swept_at, self.now + timedelta(hours=12))
+    self.assertEqual(counters.sweep(self.now + timedelta(hours=12)), 0)
+
+    venues = [venue for area in queries.venue_areas() for venue in area['venues']]
+    self.assertEqual(sorted(venue['num_upcoming_shows'] for venue in venues), [0, 1, 1, 1])
+
+  def test_show_counters_with_zone(self):
+    venue_id = self.seed(1, shows_per_venue=0)[0].id
+    artist_id = Artist.query.one().id
+    # 11:00 UTC is before the sweep at noon, 13:00 wall-clock is not
+    for start_time in ('2020-05-01T13:00:00+02:00', '2035-04-01T20:00:00Z'):
+      db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=dateutil.parser.parse(start_time)))
+      db.session.commit()
+
+    self.assertEqual(self.counts(Venue, venue_id), (1, 2))
+
+  def test_recount(self):
+    venue_ids = [venue.id for venue in self.seed(3)]
+    db.session.execute(Venue.__table__.update().values(num_upcoming_shows=0, num_past_shows=0))
+    db.session.commit()
+    counters.recount()
+    self.assertEqual([self.counts(Venue, id) for id in venue_ids], [(2, 1)] * 3)
+
+  def test_stream_list(self):
+    chunks = list(stream_list({'id': i, 'name': 'Venue %d' % i} for i in range(5000)))
+    self.assertGreater(len(chunks), 1)
+    self.assertEqual(json.loads(''.join(chunks))['data'][4999], {'id': 4999, 'name': 'Venue 4999'})
+    self.assertEqual(json.loads(''.join(stream_list([]))), {'data': []})
+
+  def test_api_venues(self):
+    venue_ids = [venue.id for venue in self.seed(3)]
+    client = app.test_client()
+    response = client.get('/api/v1/venues?fields=id,name,num_upcoming_shows')
+    self.assertTrue(response.is_streamed)
+    self.assertEqual(response.get_json()['data'], [
+      {'id': id, 'name': 'Venue %d' % i, 'num_upcoming_shows': 2} for i, id in enumerate(venue_ids)
+    ])
+    self.assertEqual(len(client.get('/api/v1/venues').get_json()['data'][0]), len(queries.STREAM_COLUMNS['venues']))
+
+    response = client.get('/api/v1/venues?fields=id,password')
+    self.assertEqual(response.status_code, 400)
+    self.assertIn('password', response.get_json()['message'])
+
+  def test_api_shows(self):
+    self.seed(2)
+    with self.count_queries() as statements:
+      shows = app.test_client().get('/api/v1/shows?fields=venue_name,artist_name,start_time').get_json()['data']
+    self.assertEqual(len(statements), 1)
+    self.assertEqual(len(shows), 6)
+    self.assertEqual(shows[0], {'venue_name': 'Venue 0', 'artist_name': 'Guns N Petals', 'start_time': '2020-04-30T12:00:00'})
+
+  def test_api_detail(self):
+    venue_id = self.seed(1)[0].id
+    client = app.test_client()
+    data = client.get('/api/v1/venues/%d?fields=name,past_shows_count' % venue_id).get_json()['data']
+    self.assertEqual(data, {'name': 'Venue 0', 'past_shows_count': 3})
+    self.assertEqual(client.get('/api/v1/artists/1000').status_code, 404)
+
+    response = client.get('/api/v1/venues/%d?fields=bogus' % venue_id)
+    self.assertEqual(response.status_code, 400)
+    self.assertIn('bogus', response.get_json()['message'])
+
+  def test_shows_csv_feed(self):
+    self.seed(2)
+    response = app.test_client().get('/shows.csv')
+    self.assertTrue(response.is_streamed)
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    self.assertEqual(len(rows), 6)
+    self.assertEqual(rows[0]['start_time'], '2020-04-30T12:00:00')
+    self.assertEqual(rows[0]['artist_name'], 'Guns N Petals')
+
+  def test_venue_ics_feed(self):
+    venue_id = self.seed(2)[0].id
+    response = app.test_client().get('/venues/%d/shows.ics' % venue_id)
+    self.assertEqual(response.mimetype, 'text/calendar')
+    text = response.get_data(as_text=True)
+    self.assertEqual(text.count('BEGIN:VEVENT'), 3)
+    self.assertIn('DTSTART:20200501T120000\r\nDTEND:20200501T140000\r\n', text)
+    self.assertIn('SUMMARY:Guns N Petals at Venue 0\r\n', text)
+    self.assertEqual(app.test_client().get('/venues/1000/shows.ics').status_code, 404)
+
+  def test_ics_line_folding(self):
+    line = 'SUMMARY:' + 'é' * 100
+    folded = ics_line(line)
+    self.assertTrue(all(len(part.encode('utf-8')) <= 75 for part in folded.split('\r\n ')))
+    self.assertEqual(folded.replace('\r\n ', ''), line + '\r\n')
+
+  def test_feeds_are_conditional(self):
+    venue_id = self.seed(1)[0].id
+    artist_id = Artist.query.one().id
+    client = app.test_client()
+    response = client.get('/artists/%d/shows.csv' % artist_id)
+    etag = response.headers['ETag']
+    self.assertNotIn('Last-Modified', response.headers)
+
+    with self.count_queries() as statements:
+      response = client.get('/artists/%d/shows.csv' % artist_id, headers={'If-None-Match': etag})
+    self.assertEqual(response.status_code, 304)
+    self.assertEqual(len(statements), 2)
+
+    db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=self.now + timedelta(days=30)))
+    db.session.commit()
+    response = client.get('/artists/%d/shows.csv' % artist_id, headers={'If-None-Match': etag})
+    self.assertEqual(response.status_code, 200)
+    self.assertNotEqual(response.headers['ETag'], etag)
+
+  def test_feed_etag_follows_every_commit(self):
+    venue_id = self.seed(1)[0].id
+    artist_id = Artist.query.one().id
+    client = app.test_client()
+    paths = ('/shows.csv', '/venues/%d/shows.csv' % venue_id, '/artists/%d/shows.csv' % artist_id)
+    def changed(etags):
+      return [client.get(path, headers={'If-None-Match': etag}).status_code for path, etag in zip(paths, etags)]
+
+    etags = [client.get(path).headers['ETag'] for path in paths]
+    self.assertEqual(changed(etags), [304, 304, 304])
+    # One show created and another deleted leave the counts as they were
+    show = Show.query.order_by(Show.id).first()
+    db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=self.now + timedelta(days=30)))
+    db.session.delete(show)
+    db.session.commit()
+    self.assertEqual(changed(etags), [200, 200, 200])
+
+    etags = [client.get(path).headers['ETag'] for path in paths]
+    # Bulk statements, as the importer and the write-behind queue run them
+    db.session.execute(Artist.__table__.update().values(name='Guns N Roses'))
+    db.session.commit()
+    self.assertEqual(changed(etags), [200, 200, 200])
+    self.assertIn('Guns N Roses', client.get(paths[0]).get_data(as_text=True))
+
+  def test_postgres_engine_options(self):
+    app.config['DB_POOL_SIZE'] = 20
+    try:
+      url, options = db.apply_driver_hacks(app, make_url('postgresql://localhost/fyyur'), {})
+    finally:
+      app.config['DB_POOL_SIZE'] = 5
+    self.assertEqual(options['pool_size'], 20)
+    self.assertIs(options['poolclass'], pool.TimedQueuePool)
+    self.assertTrue(options['pool_pre_ping'])
+    self.assertEqual(options['connect_args'], {'options': '-c statement_timeout=30000'})
+    url, options = db.apply_driver_hacks(app, make_url('sqlite://'), {})
+    self.assertNotIn('pool_size', options)
+
+  def test_pool_status(self):
+    pool.stats.reset()
+    engine = create_engine('sqlite:///' + os.path.join(self.tmpdir(), 'pool.db'), poolclass=pool.TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    connection = engine.connect()
+    status = pool.pool_status(engine)
+    self.assertEqual((status['size'], status['checked_out'], status['overflow'], status['checkouts']), (1, 1, 0, 1))
+
+    with self.assertRaises(TimeoutError):
+      engine.connect()
+    status = pool.pool_status(engine)
+    self.assertEqual(status['timeouts'], 1)
+    self.assertGreaterEqual(status['max_wait_ms'], 50)
+
+    connection.close()
+    self.assertEqual(pool.pool_status(engine)['checked_in'], 1)
+    engine.dispose()
+
+  def replica(self):
+    """Configure a replica bind on a file database with the schema and return its engine."""
+    app.config['SQLALCHEMY_BINDS'] = {'replica': 'sqlite:///' + os.path.join(self.tmpdir(), 'replica.db')}
+    engine = db.get_engine(app, bind='replica')
+    db.Model.metadata.create_all(engine)
+    def cleanup():
+      engine.dispose()
+      app.config['SQLALCHEMY_BINDS'] = None
+    self.addCleanup(cleanup)
+    return engine
+
+  def test_read_only_views_use_replica(self):
+    self.seed(1)
+    engine = self.replica()
+    engine.execute(Venue.__table__.insert().values(name='Replica venue', num_upcoming_shows=0, num_past_shows=0))
+    client = app.test_client()
+    names = [venue['name'] for venue in client.get('/api/v1/venues?fields=name').get_json()['data']]
+    self.assertEqual(names, ['Replica venue'])
+    # The test client shares the app context, and so g, of the test
+    db.session.remove()
+    del g.use_replica
+
+    # Writes go to the primary, which the client then reads for a while
+    with app.test_request_context():
+      db.session.add(Venue(name='New venue'))
+      db.session.commit()
+      self.assertGreater(session[replica.STICKY_KEY], datetime.now().timestamp())
+    self.assertEqual(Venue.query.count(), 2)
+    with client.session_transaction() as client_session:
+      client_session[replica.STICKY_KEY] = datetime.now().timestamp() + 10
+    names = [venue['name'] for venue in client.get('/api/v1/venues?fields=name').get_json()['data']]
+    self.assertEqual(names, ['Venue 0', 'New venue'])
+
+  def test_writes_are_not_sticky_without_replica(self):
+    # Nothing to add to the session, and so no cookie to send
+    with app.test_request_context():
+      db.session.add(Venue(name='New venue'))
+      db.session.commit()
+      self.assertNotIn(replica.STICKY_KEY, session)
+      self.assertFalse(session.modified)
+
+  def test_cache_is_bypassed_when_reading_own_writes(self):
+    self.seed(1)
+    engine = self.replica()
+    engine.execute(Venue.__table__.insert().values(name='Replica venue', city='Austin', state='TX', num_upcoming_shows=0, num_past_shows=0))
+    # Another client caches the venues of the replica
+    self.assertIn(b'Replica venue', app.test_client().get('/venues').data)
+    db.session.remove()
+
+    client = app.test_client()
+    with client.session_transaction() as client_session:
+      client_session[replica.STICKY_KEY] = datetime.now().timestamp() + 10
+    data = client.get('/venues').data
+    self.assertIn(b'Venue 0', data)
+    self.assertNotIn(b'Replica venue', data)
+    db.session.remove()
+    del g.use_replica
+
+  def test_views_within_query_budget(self):
+    # Over its budget, a view raises QueryBudgetExceeded when testing
+    self.seed(3)
+    client = app.test_client()
+    for path in ['/', '/venues', '/artists', '/shows', '/venues/1', '/artists/1', '/venues/genres/jazz',
+        '/artists/genres/jazz', '/venues/autocomplete?q=Ven', '/artists/autocomplete?q=Gun', '/shows/create']:
+      self.assertEqual(client.get(path).status_code, 200, path)
+    for path in ['/venues/search', '/artists/search']:
+      self.assertEqual(client.post(path, data={'search_term': 'Ven'}).status_code, 200, path)
+
+  def test_query_budget_exceeded(self):
+    self.seed(1)
+    view = app.view_functions['show_venue']
+    budget = view.query_budget
+    view.query_budget = 0
+    try:
+      with self.assertRaises(QueryBudgetExceeded):
+        app.test_client().get('/venues/1')
+    finally:
+      view.query_budget = budget
+
+  def test_check_shows_endpoint(self):
+    venue_id = self.seed(1, shows_per_venue=1)[0].id
+    artist_id = Artist.query.one().id
+    client = app.test_client()
+    response = client.post('/shows/check', json={'shows': [
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-05-01T13:00:00'},
+      {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-05-01T23:00:00Z'}
+    ]})
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['checked'], 2)
+    self.assertEqual([conflict['index'] for conflict in response.get_json()['conflicts']], [0])
+    self.assertEqual(client.post('/shows/check', data='shows').status_code, 400)
+
+  def test_check_shows_endpoint_needs_no_csrf_token(self):
+    app.config['WTF_CSRF_ENABLED'] = True
+    response = app.test_client().post('/shows/check', json={'shows': []})
+    self.assertEqual(response.status_code, 200)
+
+  def test_create_show_conflict(self):
+    venue_id = self.seed(1, shows_per_venue=1)[0].id
+    artist_id = Artist.query.one().id
+    response = app.test_client().post('/shows/create', data={
+      'venue_id': venue_id,
+      'artist_id': artist_id,
+      'start_time': '2020-05-01 13:00:00'
+    })
+
+    self.assertIn(b'already has a show', response.data)
+    self.assertEqual(Show.query.count(), 2)
+
+  def test_create_show_with_zone(self):
+    venue_id = self.seed(1, shows_per_venue=1)[0].id
+    artist_id = Artist.query.one().id
+    client = app.test_client()
+    # 12:30 UTC overlaps the seeded show at noon, as on /shows/check, the
+    # wall-clock 14:30 would not
+    response = client.post('/shows/create', data={
+      'venue_id': venue_id,
+      'artist_id': artist_id,
+      'start_time': '2020-05-01T14:30:00+02:00'
+    })
+    self.assertIn(b'already has a show', response.data)
+
+    client.post('/shows/create', data={
+      'venue_id': venue_id,
+      'artist_id': artist_id,
+      'start_time': '2035-04-01T20:00:00Z'
+    })
+    show = Show.query.order_by(Show.id.desc()).first()
+    self.assertEqual(show.start_time, datetime(2035, 4, 1, 20, 0))
+    self.assertEqual(Show.query.count(), 3)
+
+  # Every field the venue and artist pages submit
+  form_fields = {
+    'city': 'San Francisco', 'state': 'CA', 'phone': '', 'genres': 'Jazz', 'image_link': '',
+    'facebook_link': '', 'website': '', 'seeking_description': ''
+  }
+
+  def test_create_venue_invalidates_listings(self):
+    self.seed(1)
+    client = app.test_client()
+    self.assertNotIn(b'Brand New Venue', client.get('/venues').data)
+    client.post('/venues/create', data=dict(self.form_fields, name='Brand New Venue', address='1 Folsom Street'))
+
+    self.assertIn(b'Brand New Venue', client.get('/venues').data)
+    self.assertEqual(cache.stats()['routes']['venues'], {'hits': 0, 'misses': 2})
+
+  def test_edit_artist_invalidates_listings(self):
+    self.seed(1)
+    artist_id = Artist.query.one().id
+    client = app.test_client()
+    self.assertIn(b'Guns N Petals', client.get('/artists').data)
+    client.post('/artists/%d/edit' % artist_id, data=dict(self.form_fields, name='Guns N Roses'))
+
+    self.assertEqual(Artist.query.get(artist_id).name, 'Guns N Roses')
+    self.assertIn(b'Guns N Roses', client.get('/artists').data)
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
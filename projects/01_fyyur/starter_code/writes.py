@@ -0,0 +1,229 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing
+from datetime import date, datetime
+
+from models import db
+from cache import cache
+import dates
+
+#----------------------------------------------------------------------------#
+# Write-behind.
+#
+# In write-behind mode the create and edit pages do not commit to the
+# database themselves: they append the submission to a durable SQLite queue
+# and return at once. A background worker applies the queued writes in
+# batches, one transaction per batch, and records the outcome of each one
+# so the submitter can poll for it.
+#----------------------------------------------------------------------------#
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Writes claimed by a worker that died are handed out again after this long
+CLAIM_TIMEOUT = 300
+
+def to_json(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % value)
+
+class WriteQueue(object):
+    '''
+    Queue of writes stored in a SQLite file, safe to share between the
+    threads and processes of the app.
+    '''
+    def __init__(self, path):
+        self.path = path
+        with closing(self.connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS writes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    target_id INTEGER,
+                    data TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    claim TEXT,
+                    claimed_at REAL,
+                    created_at REAL NOT NULL,
+                    applied_at REAL
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_writes_status_id ON writes (status, id)')
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(self, kind, data, target_id=None):
+        '''
+        Queue a write of `kind`, an update of the row `target_id` if given,
+        a creation otherwise. Returns the id to poll its status with.
+        '''
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                'INSERT INTO writes (kind, target_id, data, status, created_at) VALUES (?, ?, ?, ?, ?)',
+                (kind, target_id, json.dumps(data, default=to_json), PENDING, time.time())
+            )
+            return cursor.lastrowid
+
+    def claim(self, limit):
+        '''
+        Take up to `limit` pending writes, oldest first, as (id, kind,
+        target_id, data) tuples.
+        '''
+        claim = uuid.uuid4().hex
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('''
+                UPDATE writes SET status = ?, claim = ?, claimed_at = ?
+                WHERE id IN (
+                    SELECT id FROM writes
+                    WHERE status = ? OR (status = ? AND claimed_at < ?)
+                    ORDER BY id LIMIT ?
+                )''', (RUNNING, claim, now, PENDING, RUNNING, now - CLAIM_TIMEOUT, limit))
+            rows = conn.execute(
+                'SELECT id, kind, target_id, data FROM writes WHERE claim = ? ORDER BY id', (claim,)
+            ).fetchall()
+            conn.execute('COMMIT')
+        return [(id, kind, target_id, json.loads(data)) for id, kind, target_id, data in rows]
+
+    def finish(self, results):
+        '''
+        Record the outcome of applied writes, (id, error) pairs where error is
+        None for the successful ones.
+        '''
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.executemany(
+                'UPDATE writes SET status = ?, error = ?, applied_at = ? WHERE id = ?',
+                [(FAILED if error else DONE, error, now, id) for id, error in results]
+            )
+
+    def status(self, id):
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                'SELECT id, kind, target_id, status, error FROM writes WHERE id = ?', (id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('id', 'kind', 'target_id', 'status', 'error'), row))
+
+    def counts(self):
+        with closing(self.connect()) as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM writes GROUP BY status').fetchall())
+
+class WriteBehind(object):
+    def __init__(self, app=None):
+        self.enabled = False
+        self.queue = None
+        self.kinds = {}
+        self.thread = None
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('WRITE_BEHIND', False)
+        self.batch_size = app.config.get('WRITE_BATCH_SIZE', 100)
+        self.poll_interval = app.config.get('WRITE_POLL_INTERVAL', 0.5)
+        if self.enabled:
+            self.queue = WriteQueue(app.config['WRITE_QUEUE_PATH'])
+            app.before_request(self.start)
+
+    def register(self, kind, model, routes):
+        '''
+        Writes of `kind` create or update `model` rows and invalidate the
+        cached `routes` once applied.
+        '''
+        self.kinds[kind] = (model, routes)
+
+    def enqueue(self, kind, data, target_id=None):
+        return self.queue.enqueue(kind, data, target_id)
+
+    def status(self, id):
+        return self.queue.status(id)
+
+    def apply(self, kind, target_id, data):
+        model, routes = self.kinds[kind]
+        if 'start_time' in data:
+            data['start_time'] = dates.to_naive_utc(data['start_time'])
+        if target_id is None:
+            db.session.add(model(**data))
+        elif db.session.query(model).filter_by(id=target_id).update(data) == 0:
+            raise LookupError('%s %d not found' % (kind, target_id))
+        return routes
+
+    def process_batch(self):
+        '''
+        Apply one batch of queued writes in a single transaction. A write
+        that fails is rolled back to its savepoint and reported without
+        failing the others. Returns the number of writes processed.
+        '''
+        writes = self.queue.claim(self.batch_size)
+        if not writes:
+            return 0
+        results = []
+        routes = set()
+        try:
+            for id, kind, target_id, data in writes:
+                savepoint = db.session.begin_nested()
+                try:
+                    routes.update(self.apply(kind, target_id, data))
+                    savepoint.commit()
+                    results.append((id, None))
+                except Exception as e:
+                    savepoint.rollback()
+                    results.append((id, '%s: %s' % (type(e).__name__, e)))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(sys.exc_info())
+            results = [(id, '%s: %s' % (type(e).__name__, e)) for id, kind, target_id, data in writes]
+        finally:
+            db.session.close()
+        cache.invalidate(*routes)
+        self.queue.finish(results)
+        return len(writes)
+
+    def drain(self):
+        '''
+        Apply every queued write, returns how many were processed.
+        '''
+        total = 0
+        while True:
+            processed = self.process_batch()
+            if not processed:
+                return total
+            total += processed
+
+    def start(self):
+        '''
+        Start the worker thread of this process, once.
+        '''
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.run, name='fyyur-write-behind', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    processed = self.process_batch()
+            except Exception:
+                print(sys.exc_info())
+                processed = 0
+            if not processed:
+                time.sleep(self.poll_interval)
+
+write_behind = WriteBehind()
@@ -0,0 +1,82 @@
+'''
+Benchmark of the question pages: slicing the whole table in Python, as
+paginate_selection used to, against LIMIT/OFFSET and keyset pages in SQL.
+
+Seeds the database with --questions questions the first time, then prints
+the time per request of each method for a few page numbers:
+
+    $ python benchmark.py --questions 1000000
+    $ python benchmark.py --database-path postgres://localhost:5432/trivia_bench
+'''
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from models import setup_db, db, Question
+
+QUESTIONS_PER_PAGE = 10
+CHUNK_SIZE = 10000
+
+def seed(count):
+    existing = Question.query.count()
+    for start in range(existing, count, CHUNK_SIZE):
+        db.session.execute(Question.__table__.insert(), [{
+            'question': 'Question %d' % i,
+            'answer': 'Answer %d' % i,
+            'category': str(i % 6 + 1),
+            'difficulty': i % 5 + 1
+        } for i in range(start, min(start + CHUNK_SIZE, count))])
+        db.session.commit()
+
+def in_python(page):
+    selection = Question.query.order_by(Question.id.asc()).all()
+    start = (page - 1) * QUESTIONS_PER_PAGE
+    return [question.format() for question in selection][start:start + QUESTIONS_PER_PAGE]
+
+def with_offset(page):
+    selection = Question.query.order_by(Question.id.asc())
+    return [question.format() for question in selection.offset((page - 1) * QUESTIONS_PER_PAGE).limit(QUESTIONS_PER_PAGE)]
+
+def with_keyset(after):
+    selection = Question.query.filter(Question.id > after).order_by(Question.id.asc())
+    return [question.format() for question in selection.limit(QUESTIONS_PER_PAGE)]
+
+def timed(function, argument, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        db.session.rollback()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, default=1000000, help='questions to seed')
+    parser.add_argument('--database-path', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'trivia_bench.db'))
+    parser.add_argument('--pages', default='1,100,10000,99999', help='comma separated page numbers')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each request, the best one counts')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    setup_db(app, args.database_path)
+    with app.app_context():
+        seed(args.questions)
+        print('page\tin_python_ms\toffset_ms\tkeyset_ms')
+        for page in [int(page) for page in args.pages.split(',')]:
+            # The id the previous page ended with, as a client would send it
+            after = 0
+            if page > 1:
+                after = db.session.query(Question.id).order_by(Question.id.asc()).offset((page - 1) * QUESTIONS_PER_PAGE - 1).limit(1).scalar()
+            row = [page] + [round(1000 * timed(function, argument, args.repeat), 2) for function, argument in (
+                (in_python, page), (with_offset, page), (with_keyset, after))]
+            print('\t'.join(str(value) for value in row))
+            sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
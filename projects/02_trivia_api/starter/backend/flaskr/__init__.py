@@ -5,7 +5,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
 
-from models import setup_db, Question, Category
+from sqlalchemy import func
+
+from models import setup_db, db, Question, Category, question_counts, question_ids, categories_cache
+from flask_query_profiler import profiler, query_budget
+from quiz_sessions import quiz_sessions, DECK_SIZE
 
 QUESTIONS_PER_PAGE = 10
 
@@ -13,6 +17,8 @@ def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
   setup_db(app)
+  profiler.init_app(app)
+  categories_cache.load()
   
   '''
   @TODO: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs
@@ -29,28 +35,88 @@ def create_app(test_config=None):
     response.headers.add('Access-Control-Allow-Methods', 'GET,PATCH,POST,DELETE,OPTIONS')
     return response
 
-  def paginate_selection(request, selection):
+  def paginate_selection(request, selection, keyset=False):
+    # The page is cut in SQL, so only QUESTIONS_PER_PAGE rows are read and
+    # formatted. With keyset, for listings ordered by id, ?after=<id> starts
+    # the page after that question, which stays fast however deep the page
     page = request.args.get('page', 1, type=int)
-    start =  (page - 1) * QUESTIONS_PER_PAGE
-    end = start + QUESTIONS_PER_PAGE
+    after = request.args.get('after', None, type=int)
+    if keyset and after is not None:
+      selection = selection.filter(Question.id > after)
+    elif page < 1:
+      abort(404)
+    else:
+      selection = selection.offset((page - 1) * QUESTIONS_PER_PAGE)
 
-    formated_selection = [el.format() for el in selection]
-    return formated_selection[start:end]
+    return [el.format() for el in selection.limit(QUESTIONS_PER_PAGE)]
   
+  def search_questions(search_term):
+    # Case-insensitive substring search, best matches first. On Postgres the
+    # pattern is served by the trigram index created in setup_search()
+    pattern = '%' + search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    questions = Question.query.filter(Question.question.ilike(pattern, escape='\\'))
+    if db.engine.dialect.name == 'postgresql':
+      return questions.order_by(func.similarity(Question.question, search_term).desc(), Question.id.asc())
+    return questions.order_by(Question.id.asc())
+
+  def quiz_category_id(body):
+    # The id of the quiz_category of a quiz request, 0 for all categories.
+    # Anything but the id of a category is a 422, checked before
+    # querying as Postgres fails on ids of the wrong type
+    quiz_category = body.get('quiz_category', None) if isinstance(body, dict) else None
+    if not isinstance(quiz_category, dict):
+      abort(422)
+    category_id = quiz_category.get('id', None)
+    if not isinstance(category_id, int) or isinstance(category_id, bool):
+      abort(422)
+    if category_id != 0 and Category.query.get(category_id) is None:
+      abort(422)
+    return category_id
+
+  def random_question(category_id, previous_questions, retry=True):
+    # A random unseen question, every one with the same chance, drawn from
+    # the cached ids of the category. While at least half of them are
+    # unseen a few draws find one, past that the unseen ones are fewer than
+    # the previous questions and are listed. A turn costs in proportion to
+    # previous_questions and one primary key lookup, whatever the size of
+    # the category
+    ids, id_set = question_ids.get(None if category_id == 0 else category_id)
+    seen = id_set.intersection(previous_questions)
+    remaining = len(ids) - len(seen)
+    if remaining == 0:
+      return None
+    if 2 * remaining >= len(ids):
+      question_id = random.choice(ids)
+      while question_id in seen:
+        question_id = random.choice(ids)
+    else:
+      question_id = random.choice([id for id in ids if id not in seen])
+    question = Question.query.get(question_id)
+    if question is None and retry:
+      # Deleted by another process since the ids were cached
+      question_ids.invalidate()
+      return random_question(category_id, previous_questions, retry=False)
+    return question
+
   '''
   @TODO: 
   Create an endpoint to handle GET requests 
   for all available categories.
   '''
   @app.route('/categories')
+  @query_budget(1)
   def get_categories():
-    categories = Category.query.order_by(Category.id.asc()).all()
+    categories, etag = categories_cache.get()
 
-    return jsonify({
+    # Clients revalidate their copy with If-None-Match
+    response = jsonify({
       'success': True,
-      'categories': {category.id: category.type for category in categories},
+      'categories': categories,
       'total_categories': len(categories)
     })
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
   '''
   @TODO: 
@@ -66,17 +132,17 @@ def create_app(test_config=None):
   '''
   @app.route('/questions')
   def get_questions():
-    selection = Question.query.order_by(Question.id.asc()).all()
-    questions_page = paginate_selection(request, selection)
+    selection = Question.query.order_by(Question.id.asc())
+    questions_page = paginate_selection(request, selection, keyset=True)
     if len(questions_page) == 0:
       abort(404)
-    categories = Category.query.order_by(Category.id.asc()).all()
+    categories, etag = categories_cache.get()
 
     return jsonify({
       'success': True,
       'questions': questions_page,
-      'total_questions': len(Question.query.all()),
-      'categories': {category.id: category.type for category in categories},
+      'total_questions': question_counts.get(),
+      'categories': categories,
       'current_category': 1
     })
 
@@ -96,15 +162,15 @@ def create_app(test_config=None):
 
       question.delete()
 
-      selection = Question.query.order_by(Question.id.asc()).all()
-      questions_page = paginate_selection(request, selection)
-      categories = Category.query.order_by(Category.id.asc()).all()
+      selection = Question.query.order_by(Question.id.asc())
+      questions_page = paginate_selection(request, selection, keyset=True)
+      categories, etag = categories_cache.get()
       return jsonify({
         'success': True,
         'deleted': question_id,
         'questions': questions_page,
-        'total_questions': len(Question.query.all()),
-        'categories': {category.id: category.type for category in categories},
+        'total_questions': question_counts.get(),
+        'categories': categories,
         'current_category': 1
       })
     except:
@@ -140,11 +206,11 @@ def create_app(test_config=None):
         search_term = body.get('searchTerm', None)
         if search_term == '':
           abort(422)
-        questions = Question.query.filter(Question.question.ilike('%' + search_term + '%'))
+        questions = search_questions(search_term)
         return jsonify({
           'success': True,
           'questions': paginate_selection(request, questions),
-          'total_questions': len(Question.query.all()),
+          'total_questions': question_counts.get(),
           'current_category': 1
         })
       else:
@@ -179,17 +245,15 @@ def create_app(test_config=None):
   '''
   @app.route('/categories/<int:categoty_id>/questions', methods=['GET'])
   def get_questions_per_category(categoty_id):
-    questions = Question.query.filter(Question.category == categoty_id).all()
-    if questions is None:
-      abort(404)
-    questions_page = paginate_selection(request, questions)
+    questions = Question.query.filter(Question.category == categoty_id).order_by(Question.id.asc())
+    questions_page = paginate_selection(request, questions, keyset=True)
     if len(questions_page) == 0:
       abort(404)
 
     return jsonify({
       'success': True,
       'questions': questions_page,
-      'total_questions': len(Question.query.all()),
+      'total_questions': question_counts.get(categoty_id),
       'current_category': 1
     })
 
@@ -210,29 +274,58 @@ def create_app(test_config=None):
     try:
       # Create a new quizze
       previous_questions = body.get('previous_questions', None)
-      quiz_category = body.get('quiz_category', None)
-      if not quiz_category:
-        abort(422)
-      category_id = quiz_category['id']
-      if category_id == 0:
-        questions = Question.query.all()
-      else:
-        questions = Question.query.filter(Question.category == category_id).all()
-      questions_bucket = []
-      for question in questions:
-        if not question.id in previous_questions:
-          questions_bucket.append(question)
-
-      question = random.choice(questions_bucket)
+      category_id = quiz_category_id(body)
+      question = random_question(category_id, previous_questions or [])
 
+      # No question left ends the quiz
       return jsonify({
         'success': True,
-        'question': question.format()
+        'question': question.format() if question else None
       })
     except:
       print(sys.exc_info())
       abort(422)
 
+  '''
+  Quiz sessions: the deck of the quiz is shuffled once and kept on the
+  server, each turn only sends the session token.
+  '''
+  @app.route('/quizzes/sessions', methods=['POST'])
+  def create_quiz_session():
+    category_id = quiz_category_id(request.get_json(silent=True))
+    questions = db.session.query(Question.id)
+    if category_id != 0:
+      questions = questions.filter(Question.category == category_id)
+    # The deck is dealt by the database, only its ids reach the app
+    deck = questions.order_by(func.random()).limit(DECK_SIZE)
+    token, total = quiz_sessions.create([question_id for question_id, in deck])
+
+    return jsonify({
+      'success': True,
+      'token': token,
+      'total_questions': total
+    })
+
+  @app.route('/quizzes/sessions/<token>/next', methods=['POST'])
+  def next_quiz_question(token):
+    try:
+      question = None
+      question_id = quiz_sessions.draw(token)
+      # Skip the questions deleted since the deck was dealt
+      while question_id is not None and question is None:
+        question = Question.query.get(question_id)
+        if question is None:
+          question_id = quiz_sessions.draw(token)
+    except KeyError:
+      abort(404)
+    if question is None:
+      quiz_sessions.end(token)
+
+    return jsonify({
+      'success': True,
+      'question': question.format() if question else None
+    })
+
   '''
   @TODO: 
   Create error handlers for all expected errors 
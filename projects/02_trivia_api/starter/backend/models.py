@@ -1,4 +1,7 @@
+import hashlib
 import os
+import threading
+import time
 from sqlalchemy import Column, String, Integer, create_engine
 from flask_sqlalchemy import SQLAlchemy
 import json
@@ -18,6 +21,36 @@ def setup_db(app, database_path=database_path):
     db.app = app
     db.init_app(app)
     db.create_all()
+    setup_indexes()
+    setup_search()
+
+'''
+setup_indexes()
+    creates the (category, id) index of the questions table, which serves
+    the pages of a category in id order without sorting its questions.
+'''
+def setup_indexes():
+    with db.engine.begin() as connection:
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_questions_category_id '
+            'ON questions (category, id)'
+        )
+
+'''
+setup_search()
+    creates the pg_trgm GIN index that serves the question search,
+    ILIKE '%term%' patterns can then use an index scan instead of a
+    sequential scan. Other databases keep searching with a plain LIKE.
+'''
+def setup_search():
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with db.engine.begin() as connection:
+        connection.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_questions_question_trgm '
+            'ON questions USING gin (question gin_trgm_ops)'
+        )
 
 '''
 Question
@@ -41,13 +74,19 @@ class Question(db.Model):
   def insert(self):
     db.session.add(self)
     db.session.commit()
+    question_counts.invalidate()
+    question_ids.invalidate()
   
   def update(self):
     db.session.commit()
+    question_counts.invalidate()
+    question_ids.invalidate()
 
   def delete(self):
     db.session.delete(self)
     db.session.commit()
+    question_counts.invalidate()
+    question_ids.invalidate()
 
   def format(self):
     return {
@@ -71,8 +110,151 @@ class Category(db.Model):
   def __init__(self, type):
     self.type = type
 
+  def insert(self):
+    db.session.add(self)
+    db.session.commit()
+    categories_cache.invalidate()
+
+  def update(self):
+    db.session.commit()
+    categories_cache.invalidate()
+
+  def delete(self):
+    db.session.delete(self)
+    db.session.commit()
+    categories_cache.invalidate()
+
   def format(self):
     return {
       'id': self.id,
       'type': self.type
-    }
\ No newline at end of file
+    }
+
+'''
+QuestionCounts
+    numbers of questions, in total and per category, for the listings.
+    Counts are cached for COUNT_TIMEOUT seconds and dropped when a question
+    is inserted, updated or deleted through the model, so a listing does
+    not count the table on every request. Other processes see the change
+    once their copy times out. On Postgres, a total over
+    APPROXIMATE_COUNT_ABOVE rows is the planner estimate of
+    pg_class.reltuples instead of an exact COUNT(*).
+'''
+COUNT_TIMEOUT = 60
+APPROXIMATE_COUNT_ABOVE = 1000000
+
+class QuestionCounts(object):
+  def __init__(self):
+    self.counts = {}
+    self.generation = 0
+    self.lock = threading.Lock()
+
+  def get(self, category=None):
+    entry = self.counts.get(category)
+    if entry is not None and entry[0] > time.time():
+      return entry[1]
+    generation = self.generation
+    count = self.estimate() if category is None else None
+    if count is None:
+      query = Question.query
+      if category is not None:
+        query = query.filter(Question.category == category)
+      count = query.count()
+    with self.lock:
+      # Don't cache a count read before a concurrent invalidation
+      if generation == self.generation:
+        self.counts[category] = (time.time() + COUNT_TIMEOUT, count)
+    return count
+
+  def estimate(self):
+    if db.engine.dialect.name != 'postgresql':
+      return None
+    estimate = db.session.execute(
+      "SELECT reltuples::bigint FROM pg_class WHERE oid = 'questions'::regclass"
+    ).scalar()
+    if estimate is None or estimate < APPROXIMATE_COUNT_ABOVE:
+      return None
+    return estimate
+
+  def invalidate(self):
+    with self.lock:
+      self.generation += 1
+      self.counts.clear()
+
+question_counts = QuestionCounts()
+
+'''
+CategoriesCache
+    the {id: type} map of the categories, with an ETag of its content.
+    create_app() loads it, and Category.insert(), update() and delete()
+    drop it. Changes made by other processes are picked up once the map is
+    CATEGORIES_TIMEOUT seconds old.
+'''
+CATEGORIES_TIMEOUT = 5 * 60
+
+class CategoriesCache(object):
+  def __init__(self):
+    self.entry = None
+    self.generation = 0
+    self.lock = threading.Lock()
+
+  def get(self):
+    entry = self.entry
+    if entry is not None and entry[0] > time.time():
+      return entry[1], entry[2]
+    return self.load()
+
+  def load(self):
+    generation = self.generation
+    categories = {category.id: category.type for category in Category.query.order_by(Category.id.asc())}
+    etag = hashlib.sha1(json.dumps(list(categories.items())).encode('utf-8')).hexdigest()
+    with self.lock:
+      # Don't cache categories read before a concurrent invalidation
+      if generation == self.generation:
+        self.entry = (time.time() + CATEGORIES_TIMEOUT, categories, etag)
+    return categories, etag
+
+  def invalidate(self):
+    with self.lock:
+      self.generation += 1
+      self.entry = None
+
+categories_cache = CategoriesCache()
+
+'''
+QuestionIds
+    ids of the questions, of all or of one category, for the quiz: a list
+    to draw from and a set to test against. Like the counts they are cached
+    for IDS_TIMEOUT seconds and dropped when a question is inserted,
+    updated or deleted through the model.
+'''
+IDS_TIMEOUT = 60
+
+class QuestionIds(object):
+  def __init__(self):
+    self.ids = {}
+    self.generation = 0
+    self.lock = threading.Lock()
+
+  def get(self, category=None):
+    entry = self.ids.get(category)
+    if entry is not None and entry[0] > time.time():
+      return entry[1], entry[2]
+    generation = self.generation
+    query = db.session.query(Question.id)
+    if category is not None:
+      query = query.filter(Question.category == category)
+    ids = [id for id, in query]
+    id_set = frozenset(ids)
+    with self.lock:
+      # Don't cache ids read before a concurrent invalidation
+      if generation == self.generation:
+        self.ids[category] = (time.time() + IDS_TIMEOUT, ids, id_set)
+    return ids, id_set
+
+  def invalidate(self):
+    with self.lock:
+      self.generation += 1
+      self.ids.clear()
+
+question_ids = QuestionIds()
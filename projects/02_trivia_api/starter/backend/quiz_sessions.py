@@ -0,0 +1,57 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+'''
+QuizSessions
+    quizzes played from the server: a session holds a shuffled deck of at
+    most DECK_SIZE question ids, drawn one per turn by its token, so the
+    client no longer sends the questions it has seen. Sessions idle for
+    SESSION_TIMEOUT seconds expire, and past MAX_SESSIONS the least
+    recently used one is dropped. They live in the process, a deployment
+    with several workers needs sticky sessions.
+'''
+DECK_SIZE = 50
+SESSION_TIMEOUT = 30 * 60
+MAX_SESSIONS = 10000
+
+class QuizSessions(object):
+    def __init__(self, max_sessions=MAX_SESSIONS, timeout=SESSION_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.timeout = timeout
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def create(self, deck):
+        '''
+        Token of a new session drawing the question ids of `deck`, already
+        shuffled, in order.
+        '''
+        deck = list(reversed(deck))
+        token = secrets.token_urlsafe(16)
+        with self.lock:
+            self.sessions[token] = (time.time() + self.timeout, deck)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        return token, len(deck)
+
+    def draw(self, token):
+        '''
+        Next question id of the session, None once the deck is empty.
+        Raises KeyError for unknown and expired sessions.
+        '''
+        with self.lock:
+            expires, deck = self.sessions[token]
+            if expires < time.time():
+                del self.sessions[token]
+                raise KeyError(token)
+            self.sessions[token] = (time.time() + self.timeout, deck)
+            self.sessions.move_to_end(token)
+            return deck.pop() if deck else None
+
+    def end(self, token):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+quiz_sessions = QuizSessions()
@@ -4,7 +4,7 @@ import json
 from flask_sqlalchemy import SQLAlchemy
 
 from flaskr import create_app
-from models import setup_db, Question, Category
+from models import setup_db, Question, Category, categories_cache
 
 
 class TriviaTestCase(unittest.TestCase):
@@ -50,6 +50,36 @@ class TriviaTestCase(unittest.TestCase):
     self.assertTrue(len(data['categories']))
     self.assertTrue(data['total_categories'])
 
+  def test_get_categories_not_modified(self):
+    res = self.client().get('/categories')
+    etag = res.headers['ETag']
+    res = self.client().get('/categories', headers={'If-None-Match': etag})
+
+    self.assertEqual(res.status_code, 304)
+    category = Category('Cooking')
+    category.insert()
+    res = self.client().get('/categories', headers={'If-None-Match': etag})
+    category.delete()
+
+    self.assertEqual(res.status_code, 200)
+    self.assertIn('Cooking', json.loads(res.data)['categories'].values())
+
+  def test_get_categories_server_timing(self):
+    # create_app() loaded the categories, nothing is left to query
+    res = self.client().get('/categories')
+
+    self.assertEqual(res.status_code, 200)
+    self.assertIn('desc="0 queries"', res.headers['Server-Timing'])
+
+  def test_get_categories_server_timing_cold_cache(self):
+    # Over the query budget of the view, the request raises when testing
+    self.app.testing = True
+    categories_cache.invalidate()
+    res = self.client().get('/categories')
+
+    self.assertEqual(res.status_code, 200)
+    self.assertIn('desc="1 queries"', res.headers['Server-Timing'])
+
   def test_get_questions(self):
     res = self.client().get('/questions')
     data = json.loads(res.data)
@@ -62,6 +92,14 @@ class TriviaTestCase(unittest.TestCase):
     self.assertTrue(len(data['categories']))
     self.assertTrue(data['current_category'])
 
+  def test_get_questions_after_cursor(self):
+    first_page = json.loads(self.client().get('/questions').data)['questions']
+    res = self.client().get('/questions?after=' + str(first_page[0]['id']))
+    data = json.loads(res.data)
+
+    self.assertEqual(res.status_code, 200)
+    self.assertEqual(data['questions'][:len(first_page) - 1], first_page[1:])
+
   def test_404_get_questions_beyond_valid_page(self):
     res = self.client().get('/questions?page=0')
     data = json.loads(res.data)
@@ -121,6 +159,14 @@ class TriviaTestCase(unittest.TestCase):
     if question:
       question.delete()
 
+  def test_total_questions_follows_inserts(self):
+    total = json.loads(self.client().get('/questions').data)['total_questions']
+    question = Question(**self.new_question)
+    question.insert()
+    self.assertEqual(json.loads(self.client().get('/questions').data)['total_questions'], total + 1)
+    question.delete()
+    self.assertEqual(json.loads(self.client().get('/questions').data)['total_questions'], total)
+
   def test_422_create_new_questions_without_question(self):
     fake_question = self.new_question
     fake_question['question'] = ''
@@ -161,6 +207,14 @@ class TriviaTestCase(unittest.TestCase):
     self.assertTrue(data['total_questions'])
     self.assertTrue(data['current_category'])
 
+  def test_search_questions_wildcards_are_literal(self):
+    res = self.client().post('/questions', json={'searchTerm': '%'})
+    data = json.loads(res.data)
+
+    self.assertEqual(res.status_code, 200)
+    self.assertEqual(data['success'], True)
+    self.assertTrue(all('%' in question['question'] for question in data['questions']))
+
   def test_422_search_questions_without_search_term(self):
     res = self.client().post('/questions', json={'searchTerm': ''})
     data = json.loads(res.data)
@@ -205,6 +259,93 @@ class TriviaTestCase(unittest.TestCase):
       self.assertTrue(isinstance(data['question'], dict))
       self.assertEqual(data['question']['category'] in categories_id, True)
 
+  def test_create_quizzes_picks_uniformly(self):
+    category_ids = [question.id for question in Question.query.filter(Question.category == 4).all()]
+    all_ids = [question.id for question in Question.query.all()]
+    # Drawn while most questions are unseen, and listed once few are left
+    for category_id, question_ids, previous_questions in (
+        (4, category_ids, []),
+        (4, category_ids, category_ids[1:-1]),
+        (0, all_ids, all_ids[3:])):
+      unseen = [id for id in question_ids if id not in previous_questions]
+      draws = 100 * len(unseen)
+      picks = dict((id, 0) for id in unseen)
+      for _ in range(draws):
+        res = self.client().post('/quizzes', json={
+          'previous_questions': previous_questions,
+          'quiz_category': {'type': None, 'id': category_id}
+        })
+        picks[json.loads(res.data)['question']['id']] += 1
+      # About 100 each, a skew such as favouring the id after a gap fails
+      for id in unseen:
+        self.assertTrue(50 < picks[id] < 150, picks)
+
+  def test_create_quizzes_server_timing(self):
+    # Once the ids of the category are cached, a turn looks up the category
+    # and the drawn question, however many questions the category holds
+    quizze_query = {'previous_questions': [], 'quiz_category': {'type': None, 'id': 1}}
+    self.client().post('/quizzes', json=quizze_query)
+    res = self.client().post('/quizzes', json=quizze_query)
+
+    self.assertEqual(res.status_code, 200)
+    self.assertIn('desc="2 queries"', res.headers['Server-Timing'])
+
+  def test_create_quizzes_until_no_question_left(self):
+    previous_questions = []
+    while True:
+      res = self.client().post('/quizzes', json={
+        'previous_questions': previous_questions,
+        'quiz_category': {'type': None, 'id': 1}
+      })
+      data = json.loads(res.data)
+      self.assertEqual(res.status_code, 200)
+      if data['question'] is None:
+        break
+      self.assertNotIn(data['question']['id'], previous_questions)
+      previous_questions.append(data['question']['id'])
+
+    self.assertEqual(len(previous_questions), len(Question.query.filter(Question.category == 1).all()))
+
+  def test_quiz_session(self):
+    res = self.client().post('/quizzes/sessions', json={'quiz_category': {'type': None, 'id': 1}})
+    data = json.loads(res.data)
+    self.assertEqual(res.status_code, 200)
+    self.assertTrue(data['total_questions'])
+
+    question_ids = []
+    for _ in range(data['total_questions']):
+      question = json.loads(self.client().post('/quizzes/sessions/' + data['token'] + '/next').data)['question']
+      question_ids.append(question['id'])
+    self.assertEqual(len(set(question_ids)), data['total_questions'])
+    last = json.loads(self.client().post('/quizzes/sessions/' + data['token'] + '/next').data)
+    self.assertEqual(last['question'], None)
+
+  def test_422_create_quiz_session_with_invalid_category(self):
+    for body in ({'quiz_category': 1}, {'quiz_category': {'id': -1}}, ['quiz_category']) + self.invalid_category_ids:
+      res = self.client().post('/quizzes/sessions', json=body)
+      data = json.loads(res.data)
+
+      self.assertEqual(res.status_code, 422)
+      self.assertEqual(data['success'], False)
+
+  # Ids of the wrong type, a DataError on Postgres if queried
+  invalid_category_ids = tuple({'quiz_category': {'type': None, 'id': id}} for id in ('x', 1.5, [1], True))
+
+  def test_422_create_quizzes_with_invalid_category_id(self):
+    for body in self.invalid_category_ids:
+      res = self.client().post('/quizzes', json=dict(body, previous_questions=[]))
+      data = json.loads(res.data)
+
+      self.assertEqual(res.status_code, 422)
+      self.assertEqual(data['success'], False)
+
+  def test_404_quiz_session_does_not_exist(self):
+    res = self.client().post('/quizzes/sessions/unknown/next')
+    data = json.loads(res.data)
+
+    self.assertEqual(res.status_code, 404)
+    self.assertEqual(data['success'], False)
+
   def test_404_create_quizzes_with_invalid_category(self):
     quizze_query = {
       'previous_questions': [],
@@ -8,9 +8,11 @@ from flask_cors import CORS
 from database.models import db_drop_and_create_all, setup_db, Drink
 from auth.auth import AuthError, requires_auth
 from users.m2m import Auth0Manager
+from flask_query_profiler import profiler, query_budget
 
 app = Flask(__name__)
 setup_db(app)
+profiler.init_app(app)
 CORS(app)
 m2m = Auth0Manager()
 
@@ -124,6 +126,7 @@ def patch_baristas(jwt, role_id):
         or appropriate status code indicating reason for failure
 '''
 @app.route('/drinks')
+@query_budget(1)
 def get_drinks():
   drinks = Drink.query.all()
   ret = jsonify({